@@ -0,0 +1,140 @@
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Callable, Iterable, Optional
+
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+
+from .config import MAX_UPLOAD_BYTES, PROCESSING_QUEUE, PROCESSING_WORKERS, RETRY_AFTER_SECONDS
+
+
+RETRY_HEADERS = {"Retry-After": str(RETRY_AFTER_SECONDS)}
+POOL_FULL_DETAIL = "Too many uploads in progress, try again shortly"
+
+
+def overloaded(status_code: int, detail: str) -> HTTPException:
+    """A fast 429/503 telling the client when to try again"""
+    return HTTPException(status_code=status_code, detail=detail, headers=RETRY_HEADERS)
+
+
+class Slot:
+    """An admitted request's place in the ProcessingPool; releasing it twice is harmless"""
+
+    def __init__(self, semaphore: threading.BoundedSemaphore):
+        self._semaphore = semaphore
+        self._held = True
+        self._lock = threading.Lock()
+
+    def release(self):
+        with self._lock:
+            if self._held:
+                self._held = False
+                self._semaphore.release()
+
+
+class ProcessingPool:
+    """
+    Bounded executor for the blocking stages of upload requests.
+
+    At most `workers` requests have work running, and at most `queue_size` more
+    wait for a thread; any request beyond that is turned away with a 429 and a
+    Retry-After header (by AdmissionControl, before its body is read) instead
+    of piling up. The event loop itself
+    only ever awaits the pool, so health checks and other routes stay responsive
+    however many uploads are in flight.
+    """
+
+    def __init__(self, workers: int = PROCESSING_WORKERS, queue_size: int = PROCESSING_QUEUE):
+        self.workers = max(1, workers)
+        self._slots = threading.BoundedSemaphore(self.workers + max(0, queue_size))
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="visa-processing")
+            return self._executor
+
+    def acquire(self) -> Optional[Slot]:
+        """A slot for one request, or None when all are taken"""
+        if not self._slots.acquire(blocking=False):
+            return None
+        return Slot(self._slots)
+
+    async def run(self, func: Callable, *args):
+        """Runs func(*args) on a pool thread, with the caller's context variables (like run_in_threadpool)"""
+        context = contextvars.copy_context()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_executor(), partial(context.run, func, *args))
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+processing_pool = ProcessingPool()
+
+
+class AdmissionControl:
+    """
+    ASGI middleware holding a ProcessingPool slot for every request to `paths`,
+    from before its body is read until its response, streamed or not, and its
+    background tasks are done. Without a free slot the request is answered 429
+    at once, so a client turned away doesn't pay for sending its upload.
+    """
+
+    def __init__(self, app, paths: Iterable[str], pool: ProcessingPool = processing_pool):
+        self.app = app
+        self.paths = frozenset(paths)
+        self.pool = pool
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+        slot = self.pool.acquire()
+        if slot is None:
+            response = JSONResponse({"detail": POOL_FULL_DETAIL}, status_code=429, headers=RETRY_HEADERS)
+            await response(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            slot.release()
+
+
+class UploadSizeLimit:
+    """
+    ASGI middleware answering 413 to requests whose Content-Length exceeds
+    `max_bytes`, before any of the body is read. Uploads sent without a length
+    are checked by the routes once received (see check_upload_size).
+    """
+
+    def __init__(self, app, max_bytes: int = MAX_UPLOAD_BYTES):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and self.max_bytes > 0:
+            length = dict(scope["headers"]).get(b"content-length")
+            if length is not None and length.isdigit() and int(length) > self.max_bytes:
+                response = JSONResponse({"detail": _too_large_detail(self.max_bytes)}, status_code=413)
+                await response(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
+
+
+def _too_large_detail(max_bytes: int) -> str:
+    return f"Upload exceeds the {max_bytes:,} byte limit"
+
+
+def check_upload_size(size: Optional[int], max_bytes: int = MAX_UPLOAD_BYTES):
+    """413 for an upload (or the files of a batch together) larger than the limit"""
+    if max_bytes > 0 and size is not None and size > max_bytes:
+        raise HTTPException(status_code=413, detail=_too_large_detail(max_bytes))
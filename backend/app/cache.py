@@ -0,0 +1,82 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from .config import PARSE_CACHE_DIR, PARSE_CACHE_SIZE
+from .parser import PARSE_FORMAT_VERSION
+
+
+def report_key(report_text: str, version: int = PARSE_FORMAT_VERSION) -> str:
+    """Content address of a single report, as parsed by parser format `version`"""
+    digest = hashlib.blake2b(f"{version}\0".encode("utf-8"), digest_size=20)
+    digest.update(report_text.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class ParseCache:
+    """
+    Parsed reports keyed by the hash of their text (and the parser format
+    version, see parser.PARSE_FORMAT_VERSION).
+
+    An in-memory LRU holds the most recent entries; with a directory configured,
+    every entry is also written there as JSON so it survives restarts and is
+    shared between worker processes.
+    """
+
+    def __init__(self, max_entries: int, directory: Optional[str] = None):
+        self.max_entries = max_entries
+        self.directory = directory
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                return dict(data)
+
+        if self.directory:
+            try:
+                with open(self._path(key), encoding="utf-8") as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                return None
+            self._remember(key, data)
+            return dict(data)
+        return None
+
+    def put(self, key: str, data: Dict):
+        self._remember(key, dict(data))
+        if self.directory:
+            path = self._path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, path)
+
+    def _remember(self, key: str, data: Dict):
+        with self._lock:
+            self._entries[key] = data
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# Shared cache for the app; None when caching is switched off
+parse_cache: Optional[ParseCache] = (
+    ParseCache(PARSE_CACHE_SIZE, PARSE_CACHE_DIR) if PARSE_CACHE_SIZE > 0 else None
+)
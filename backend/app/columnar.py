@@ -0,0 +1,234 @@
+import re
+from typing import Dict, List, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from .parser import HEADER_INDEX, ROW_LAYOUT, ROWS_PER_REPORT, ParsedReport, _amount_value, _count_value
+from .validation import RECONCILIATION_COLUMN, reconcile
+
+METADATA_COLUMNS = ['ReportID', 'ReportingFor', 'TransactionType', 'RollupTo', 'FundsXferEntity',
+                    'ProcDate', 'ReportDate', 'SettlementCurrency']
+
+COLUMN_ORDER = METADATA_COLUMNS + ['MajorType', 'MinorType', 'Count',
+                                   'CreditAmount', 'DebitAmount', 'TotalAmount', 'TotalType',
+                                   RECONCILIATION_COLUMN]
+
+# ParsedReport positions that carry a count
+_COUNT_POSITIONS = [i for i, (_, _, _, has_count) in enumerate(ROW_LAYOUT) if has_count]
+_HAS_COUNT = np.array([has_count for _, _, _, has_count in ROW_LAYOUT])
+_REPORTING_FOR = HEADER_INDEX['ReportingFor']
+_METADATA_POSITIONS = [HEADER_INDEX.get(col) for col in METADATA_COLUMNS]
+
+_MAJOR_TYPES = np.array([major for major, _, _, _ in ROW_LAYOUT], dtype=object)
+_MINOR_TYPES = np.array([minor for _, minor, _, _ in ROW_LAYOUT], dtype=object)
+
+
+def _number(value, is_amount: bool):
+    """Numeric value of a parsed field, falling back to 0 like the row transform always has"""
+    if isinstance(value, (int, float)):
+        return value
+    if value is not None:
+        try:
+            return _amount_value(value) if is_amount else _count_value(value)
+        except (ValueError, TypeError):
+            pass
+    return 0.0 if is_amount else 0
+
+
+# ========= BULK NUMERIC DECODING =========
+# Widest amount or count decoded in bulk (at most 18 digits, so no int64 overflow);
+# anything longer takes the scalar path
+FIELD_WIDTH = 24
+_DIGIT, _POINT, _SEPARATOR, _OTHER = 0, 1, 2, 3
+_CHAR_CLASS = np.full(256, _OTHER, dtype=np.uint8)
+_CHAR_CLASS[ord("0"):ord("9") + 1] = _DIGIT
+_CHAR_CLASS[ord(".")] = _POINT
+_CHAR_CLASS[ord(",")] = _SEPARATOR
+_ZERO, _C, _R, _D, _B = (ord(c) for c in "0CRDB")
+
+
+def _layout(decimals: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Character class and place value of every position of a right-aligned
+    number as VSS-110 prints it: `decimals` digits after the point and a
+    thousands separator between every group of three whole digits.
+    """
+    kinds, weights = [_DIGIT] * decimals, [10 ** k for k in range(decimals)]
+    if decimals:
+        kinds.append(_POINT)
+        weights.append(0)
+    place = decimals
+    for j in range(FIELD_WIDTH - len(kinds)):
+        if j % 4 == 3:
+            kinds.append(_SEPARATOR)
+            weights.append(0)
+        else:
+            kinds.append(_DIGIT)
+            weights.append(10 ** place)
+            place += 1
+    return np.array(kinds[::-1], dtype=np.uint8), np.array(weights[::-1], dtype=np.int64)
+
+
+_LAYOUTS = {0: _layout(0), 2: _layout(2)}
+# Non-digit positions left of a number of each length; those read as '0' padding
+_PADDED_MISMATCHES = {
+    decimals: np.array([np.count_nonzero(kinds[:FIELD_WIDTH - length] != _DIGIT)
+                        for length in range(FIELD_WIDTH + 1)])
+    for decimals, (kinds, _) in _LAYOUTS.items()
+}
+_PADDING = "0" * FIELD_WIDTH
+_EXACT_UNITS = 2 ** 53
+
+
+def _decode_printed(values: Sequence, decimals: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (values, decoded) for numbers in the exact form VSS-110 prints them, e.g.
+    '1,234.56CR'. All strings are laid end to end in one byte buffer, each
+    preceded by FIELD_WIDTH '0's, and read as a right-aligned FIELD_WIDTH
+    window; the layout check and the place values are then whole-array
+    operations. Rows that are not in that exact form are flagged as not decoded.
+    """
+    n = len(values)
+    try:
+        text = _PADDING + _PADDING.join(values)
+        strings = np.ones(n, dtype=bool)
+    except TypeError:  # numbers or None among the strings
+        strings = np.fromiter((type(value) is str for value in values), dtype=bool, count=n)
+        values = [value if type(value) is str else "" for value in values]
+        text = _PADDING + _PADDING.join(values)
+    lengths = np.fromiter(map(len, values), dtype=np.int64, count=n)
+    decoded = strings.copy()
+    buffer = np.frombuffer(text.encode("ascii", "replace"), dtype=np.uint8)
+    ends = np.cumsum(lengths + FIELD_WIDTH)
+
+    credit = (buffer[ends - 2] == _C) & (buffer[ends - 1] == _R)
+    debit = (buffer[ends - 2] == _D) & (buffer[ends - 1] == _B)
+    number_ends = ends - 2 * (credit | debit)
+    number_lengths = number_ends - (ends - lengths)
+
+    kinds, weights = _LAYOUTS[decimals]
+    decoded &= (number_lengths >= (decimals + 2 if decimals else 1)) & (number_lengths <= FIELD_WIDTH)
+    decoded &= kinds[np.clip(FIELD_WIDTH - number_lengths, 0, FIELD_WIDTH - 1)] == _DIGIT
+    if not decimals:
+        decoded &= ~(credit | debit)
+
+    # Left of each number the window only holds '0' padding, so every mismatch
+    # beyond the ones the padding itself causes is a character out of place
+    chars = sliding_window_view(buffer, FIELD_WIDTH)[number_ends - FIELD_WIDTH]
+    mismatches = np.count_nonzero(_CHAR_CLASS[chars] != kinds, axis=1)
+    decoded &= mismatches == _PADDED_MISMATCHES[decimals][np.clip(number_lengths, 0, FIELD_WIDTH)]
+
+    units = np.zeros(n, dtype=np.int64)
+    for column in np.flatnonzero(weights).tolist():
+        units += (chars[:, column] - _ZERO) * weights[column]
+    # Beyond 2**53 the float of the digits is no longer exact; leave those to float()
+    decoded &= units <= _EXACT_UNITS
+    # Blank fields read as zero, which is what the all-padding window holds
+    decoded |= strings & (lengths == 0)
+    numbers = units / 10 ** decimals if decimals else units.astype(np.float64)
+    return np.where(debit, -numbers, numbers), decoded
+
+
+def _decode(values: Sequence, is_amount: bool) -> np.ndarray:
+    numbers, decoded = _decode_printed(values, 2 if is_amount else 0)
+    # Anything else (numbers, blanks, unusual spacing or separators, garbage) the scalar way
+    for i in np.flatnonzero(~decoded).tolist():
+        numbers[i] = _number(values[i], is_amount)
+    return numbers
+
+
+def decode_amounts(values: Sequence) -> np.ndarray:
+    """
+    float64 amounts of raw captured strings, identical to parse_amount one by
+    one: commas dropped, CR positive, DB negative, 0 for blanks and garbage.
+    Values that are already numbers are kept.
+    """
+    return _decode(values, True)
+
+
+def decode_counts(values: Sequence) -> np.ndarray:
+    """Counts of raw captured strings as float64, identical to parse_count one by one"""
+    return _decode(values, False)
+
+
+def report_metadata(report: ParsedReport) -> Tuple[str, ...]:
+    """Metadata columns of a report, with ReportingFor split into ReportingFor and TransactionType"""
+    headers = report.headers
+    reporting_for_full = headers[_REPORTING_FOR] or ""
+    split_parts = re.split(r'\s{2,}', reporting_for_full.strip())  # split on 2+ spaces
+
+    if len(split_parts) == 2:
+        reporting_for, transaction_type = split_parts
+    else:
+        reporting_for, transaction_type = reporting_for_full, ""
+
+    split = {'ReportingFor': reporting_for, 'TransactionType': transaction_type}
+    return tuple(
+        split[col] if col in split else (headers[position] or '')
+        for col, position in zip(METADATA_COLUMNS, _METADATA_POSITIONS)
+    )
+
+
+class ReportBatchBuilder:
+    """
+    Accumulates the rows of many parsed reports into columns.
+
+    Each report only appends its raw field values; amounts and counts are
+    decoded for the whole batch at once (decode_amounts / decode_counts), and
+    TotalType, the absolute TotalAmount and the reconciliation checks
+    (validation.reconcile) are computed vectorized, when the single DataFrame
+    for the batch is built.
+    """
+
+    def __init__(self):
+        self._metadata: List[Tuple[str, ...]] = []
+        self._count: List = []
+        self._credit: List = []
+        self._debit: List = []
+        self._total: List = []
+
+    def __len__(self) -> int:
+        return len(self._metadata)
+
+    def add(self, report: Union[ParsedReport, Dict]):
+        """
+        Appends the rows of one report: a ParsedReport from extract_visa_report,
+        or a flat dict like parse_visa_report returns. Missing fields decode to 0.
+        """
+        if not isinstance(report, ParsedReport):
+            report = ParsedReport.from_dict(report)
+        self._metadata.append(report_metadata(report))
+        count = report.count
+        self._count.extend([count[i] for i in _COUNT_POSITIONS])
+        self._credit.extend(report.credit)
+        self._debit.extend(report.debit)
+        self._total.extend(report.total)
+
+    def to_frame(self) -> pd.DataFrame:
+        n_reports = len(self._metadata)
+        metadata = np.empty((n_reports, len(METADATA_COLUMNS)), dtype=object)
+        if n_reports:
+            metadata[:] = self._metadata
+
+        # Rows without a count column stay NaN
+        count = np.full(n_reports * ROWS_PER_REPORT, np.nan)
+        count[np.tile(_HAS_COUNT, n_reports)] = decode_counts(self._count)
+        total = decode_amounts(self._total)
+
+        columns = {col: np.repeat(metadata[:, i], ROWS_PER_REPORT)
+                   for i, col in enumerate(METADATA_COLUMNS)}
+        columns['MajorType'] = np.tile(_MAJOR_TYPES, n_reports)
+        columns['MinorType'] = np.tile(_MINOR_TYPES, n_reports)
+        columns['Count'] = count
+        columns['CreditAmount'] = decode_amounts(self._credit)
+        columns['DebitAmount'] = decode_amounts(self._debit)
+        columns['TotalAmount'] = np.abs(total)
+        columns['TotalType'] = np.where(total >= 0, 'CR', 'DB').astype(object)
+        # Checked per report, flagged on each of its rows
+        columns[RECONCILIATION_COLUMN] = np.repeat(
+            reconcile(count, columns['CreditAmount'], columns['DebitAmount'], total), ROWS_PER_REPORT
+        )
+
+        return pd.DataFrame(columns, columns=COLUMN_ORDER)
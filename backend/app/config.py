@@ -0,0 +1,90 @@
+import os
+
+# ========= PARSING =========
+# Worker processes used to parse multi-report bundles (0 parses in-process)
+PARSE_WORKERS = int(os.getenv("VISA_PARSE_WORKERS", "0"))
+# Reports handed to a worker per task
+PARSE_CHUNK_SIZE = int(os.getenv("VISA_PARSE_CHUNK_SIZE", "64"))
+
+# ========= PARSE CACHE =========
+# Parsed reports kept in memory, keyed by a hash of the report text (0 disables the cache)
+PARSE_CACHE_SIZE = int(os.getenv("VISA_PARSE_CACHE_SIZE", "5000"))
+# Optional directory for an on-disk tier of the cache
+PARSE_CACHE_DIR = os.getenv("VISA_PARSE_CACHE_DIR") or None
+
+# ========= OUTPUT =========
+# Generated files stay in memory up to this size, then spill to a temp file
+OUTPUT_SPOOL_MAX_BYTES = int(os.getenv("VISA_OUTPUT_SPOOL_MAX_BYTES", str(16 * 1024 * 1024)))
+# Size of the pieces a generated file is streamed to the client in
+OUTPUT_CHUNK_SIZE = int(os.getenv("VISA_OUTPUT_CHUNK_SIZE", str(64 * 1024)))
+
+# ========= LOGGING =========
+# Level of the application loggers (DEBUG, INFO, WARNING, ...)
+LOG_LEVEL = os.getenv("VISA_LOG_LEVEL", "INFO").upper()
+# Trace every parsed field of every report by default (normally switched on per request)
+LOG_TRACE = os.getenv("VISA_LOG_TRACE", "0") == "1"
+
+# ========= METRICS =========
+# Add a Server-Timing header with the stage durations to processed uploads
+SERVER_TIMING = os.getenv("VISA_SERVER_TIMING", "1") == "1"
+
+# ========= BACKGROUND JOBS =========
+# Uploads processed at the same time by POST /jobs; the rest wait in the queue
+JOB_WORKERS = int(os.getenv("VISA_JOB_WORKERS", "1"))
+# Where job uploads and results are kept
+JOB_DIR = os.getenv("VISA_JOB_DIR") or None
+# Finished jobs (and their result files) are forgotten after this many seconds
+JOB_TTL_SECONDS = int(os.getenv("VISA_JOB_TTL_SECONDS", "3600"))
+
+# ========= BATCH UPLOADS =========
+# Files of one batch request processed at the same time
+BATCH_FILE_WORKERS = int(os.getenv("VISA_BATCH_FILE_WORKERS", "4"))
+
+# ========= STARTUP =========
+# When a worker loads pandas, openpyxl and the batch modules: "background" (right after startup,
+# without delaying it), "startup" (before serving anything) or "off" (on the first upload)
+WARMUP = os.getenv("VISA_WARMUP", "background").lower()
+# Create missing tables and apply schema revisions at startup; set to 0 when
+# `python -m app.migrations` runs once per deploy instead
+MIGRATE_ON_STARTUP = os.getenv("VISA_MIGRATE_ON_STARTUP", "1") == "1"
+
+# ========= DATABASE =========
+# Any SQLAlchemy URL; point it at Postgres (postgresql+psycopg://...) to share one database between nodes
+DATABASE_URL = os.getenv("SQLALCHEMY_DATABASE_URL", "sqlite:///./visa_reports.db")
+# Connections kept open per process, and how many more may be opened under load
+DB_POOL_SIZE = int(os.getenv("VISA_DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("VISA_DB_MAX_OVERFLOW", "10"))
+# Seconds after which a pooled connection is replaced (-1 never)
+DB_POOL_RECYCLE = int(os.getenv("VISA_DB_POOL_RECYCLE", "1800"))
+# SQLite only: memory-mapped I/O size, page cache size and how long a writer waits for a lock
+SQLITE_MMAP_SIZE = int(os.getenv("VISA_SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE_KIB = int(os.getenv("VISA_SQLITE_CACHE_SIZE_KIB", str(64 * 1024)))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("VISA_SQLITE_BUSY_TIMEOUT_MS", "30000"))
+
+# ========= DROP DIRECTORY WATCHER =========
+# Directory tailed by `python -m app.watcher`; new complete reports are stored as they land
+WATCH_DIR = os.getenv("VISA_WATCH_DIR") or None
+# Files of the directory that are tailed (glob)
+WATCH_PATTERN = os.getenv("VISA_WATCH_PATTERN", "*")
+# JSON file with the byte offset reached in every file (default: .visa-watch-offsets.json in WATCH_DIR)
+WATCH_CHECKPOINT = os.getenv("VISA_WATCH_CHECKPOINT") or None
+# Seconds between scans of the directory
+WATCH_INTERVAL_SECONDS = float(os.getenv("VISA_WATCH_INTERVAL_SECONDS", "5"))
+# Bytes read per step; each step's complete reports are stored and checkpointed together
+WATCH_READ_BYTES = int(os.getenv("VISA_WATCH_READ_BYTES", str(8 * 1024 * 1024)))
+
+# ========= ADMISSION CONTROL =========
+# Threads doing the blocking work (spooling, parsing, storing, exporting) of upload requests
+PROCESSING_WORKERS = int(os.getenv("VISA_PROCESSING_WORKERS", "4"))
+# Upload requests admitted beyond the workers (still uploading, or waiting for a thread);
+# any more get a 429 before their body is read
+PROCESSING_QUEUE = int(os.getenv("VISA_PROCESSING_QUEUE", "16"))
+# Jobs (queued or running) POST /jobs accepts before answering 503
+JOB_QUEUE_MAX = int(os.getenv("VISA_JOB_QUEUE_MAX", "100"))
+# Retry-After sent with 429/503 answers
+RETRY_AFTER_SECONDS = int(os.getenv("VISA_RETRY_AFTER_SECONDS", "5"))
+# Largest request body accepted, in bytes (0 for no limit)
+MAX_UPLOAD_BYTES = int(os.getenv("VISA_MAX_UPLOAD_BYTES", str(512 * 1024 * 1024)))
+# Zip uploads: most files per archive and most bytes they may expand to
+MAX_ARCHIVE_MEMBERS = int(os.getenv("VISA_MAX_ARCHIVE_MEMBERS", "10000"))
+MAX_EXPANDED_BYTES = int(os.getenv("VISA_MAX_EXPANDED_BYTES", str(4 * 1024 * 1024 * 1024)))
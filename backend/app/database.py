@@ -1,12 +1,69 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./visa_reports.db"
-
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}  # SQLite specific
+from .config import (
+    DATABASE_URL, DB_MAX_OVERFLOW, DB_POOL_RECYCLE, DB_POOL_SIZE,
+    SQLITE_BUSY_TIMEOUT_MS, SQLITE_CACHE_SIZE_KIB, SQLITE_MMAP_SIZE
 )
+
+SQLALCHEMY_DATABASE_URL = DATABASE_URL
+
+# Applied to every new SQLite connection. WAL lets readers run alongside an
+# ingest write; with WAL, synchronous=NORMAL is still safe against corruption
+# and only skips an fsync per commit.
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "mmap_size": SQLITE_MMAP_SIZE,
+    "cache_size": -SQLITE_CACHE_SIZE_KIB,  # negative means KiB rather than pages
+    "temp_store": "MEMORY",
+    "busy_timeout": SQLITE_BUSY_TIMEOUT_MS,
+}
+
+
+def set_sqlite_pragmas(engine: Engine, pragmas: dict):
+    @event.listens_for(engine, "connect")
+    def _apply(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+
+def make_engine(url: str = SQLALCHEMY_DATABASE_URL) -> Engine:
+    """The application engine: pooled, with SQLite tuned on connect"""
+    if url.startswith("sqlite"):
+        if make_url(url).database in (None, "", ":memory:"):
+            # Every connection to an in-memory database is a new, empty one, so
+            # all threads share a single connection instead of a sized pool
+            pool_args = {"poolclass": StaticPool}
+        else:
+            pool_args = {"pool_size": DB_POOL_SIZE, "max_overflow": DB_MAX_OVERFLOW}
+        engine = create_engine(
+            url,
+            connect_args={
+                "check_same_thread": False,  # pooled connections move between threads
+                "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000,
+            },
+            **pool_args,
+        )
+        set_sqlite_pragmas(engine, SQLITE_PRAGMAS)
+        return engine
+
+    return create_engine(
+        url,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=True,
+    )
+
+
+engine = make_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
-
@@ -0,0 +1,190 @@
+import os
+import shutil
+import tempfile
+from functools import lru_cache
+from typing import TYPE_CHECKING, BinaryIO, Dict, Iterable, Iterator, Union
+
+from fastapi import HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.pool import NullPool
+
+from .config import OUTPUT_CHUNK_SIZE, OUTPUT_SPOOL_MAX_BYTES
+from .database import set_sqlite_pragmas
+
+# pandas and openpyxl are imported by the writers that use them, so the app
+# starts (and serves its light routes) without loading either
+if TYPE_CHECKING:
+    import pandas as pd
+    from openpyxl.cell import WriteOnlyCell
+
+EXCEL_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+SHEET_NAME = "Sheet1"
+SQLITE_MEDIA_TYPE = "application/octet-stream"
+SQLITE_TABLE_NAME = "visa_report"
+PARQUET_MEDIA_TYPE = "application/vnd.apache.parquet"
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+CSV_MEDIA_TYPE = "text/csv"
+
+
+@lru_cache(maxsize=None)
+def _header_style():
+    """(font, border, alignment) of header cells: the same look as DataFrame.to_excel"""
+    from openpyxl.styles import Alignment, Border, Font, Side
+
+    thin = Side(style="thin")
+    return (Font(bold=True), Border(left=thin, right=thin, top=thin, bottom=thin),
+            Alignment(horizontal="center", vertical="top"))
+
+
+def _display_lengths(column: "pd.Series") -> "pd.Series":
+    """Length of each non-empty cell as Excel shows it; blanks, zeros and NaN don't count"""
+    from pandas.api.types import is_numeric_dtype
+
+    if is_numeric_dtype(column):
+        values = column[column.notna() & (column != 0)]
+        # Whole numbers read back without the trailing .0
+        return values.astype(str).str.replace(r"\.0$", "", regex=True).str.len()
+    values = column[column.notna()].astype(str)
+    return values[values != ""].str.len()
+
+
+def column_widths(df: "pd.DataFrame") -> Dict[str, int]:
+    """Autosized width per column letter: longest cell (header included) plus padding"""
+    from openpyxl.utils import get_column_letter
+
+    widths = {}
+    for i, name in enumerate(df.columns, start=1):
+        lengths = _display_lengths(df[name])
+        longest = max(len(str(name)), int(lengths.max()) if len(lengths) else 0)
+        widths[get_column_letter(i)] = longest + 2
+    return widths
+
+
+def _header_cell(ws, value) -> "WriteOnlyCell":
+    from openpyxl.cell import WriteOnlyCell
+
+    cell = WriteOnlyCell(ws, value=value)
+    cell.font, cell.border, cell.alignment = _header_style()
+    return cell
+
+
+def write_excel(df: "pd.DataFrame", target: Union[str, BinaryIO]):
+    """
+    Writes df as an autosized .xlsx in one pass.
+
+    Column widths come from vectorized string lengths on the DataFrame, and the
+    workbook is streamed out in write-only mode, so the file is never reloaded
+    or held in memory cell by cell.
+    """
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(SHEET_NAME)
+    for letter, width in column_widths(df).items():
+        ws.column_dimensions[letter].width = width
+
+    ws.append([_header_cell(ws, str(name)) for name in df.columns])
+    values = df.astype(object).where(df.notna(), None)
+    for row in values.itertuples(index=False, name=None):
+        ws.append(row)
+
+    wb.save(target)
+
+
+# The export is a throwaway file built by one writer: no journal, no fsync
+EXPORT_SQLITE_PRAGMAS = {"journal_mode": "OFF", "synchronous": "OFF", "temp_store": "MEMORY"}
+
+
+def _insert_rows(table, conn, keys, data_iter):
+    """to_sql insert method: one plain executemany, skipping SQLAlchemy's per-row type processing"""
+    columns = ", ".join(f'"{key}"' for key in keys)
+    placeholders = ", ".join("?" * len(keys))
+    conn.exec_driver_sql(f'INSERT INTO "{table.name}" ({columns}) VALUES ({placeholders})', list(data_iter))
+
+
+def write_sqlite(df: "pd.DataFrame", db_path: str, table_name: str = SQLITE_TABLE_NAME):
+    engine = create_engine(f"sqlite:///{db_path}", poolclass=NullPool)
+    set_sqlite_pragmas(engine, EXPORT_SQLITE_PRAGMAS)
+    try:
+        with engine.begin() as conn:
+            df.to_sql(table_name, conn, if_exists="replace", index=False, method=_insert_rows)
+    finally:
+        engine.dispose()
+
+
+# ========= PER-REQUEST ARTIFACTS =========
+def spooled_artifact() -> tempfile.SpooledTemporaryFile:
+    """Private buffer for one response: in memory while small, a temp file once it grows"""
+    return tempfile.SpooledTemporaryFile(max_size=OUTPUT_SPOOL_MAX_BYTES, mode="w+b")
+
+
+def excel_artifact(df: "pd.DataFrame") -> tempfile.SpooledTemporaryFile:
+    artifact = spooled_artifact()
+    write_excel(df, artifact)
+    return artifact
+
+
+def sqlite_artifact(df: "pd.DataFrame") -> tempfile.SpooledTemporaryFile:
+    """
+    SQLite export of df. SQLite needs a real path, so the database is built in
+    a private temp directory, copied into the spool and the directory removed.
+    """
+    workdir = tempfile.mkdtemp(prefix="visa-report-")
+    try:
+        db_path = os.path.join(workdir, "report.db")
+        write_sqlite(df, db_path)
+        artifact = spooled_artifact()
+        with open(db_path, "rb") as db_file:
+            shutil.copyfileobj(db_file, artifact, OUTPUT_CHUNK_SIZE)
+        return artifact
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+    except ImportError:
+        raise HTTPException(status_code=501, detail="Parquet and Arrow output need the pyarrow package")
+    return pyarrow
+
+
+def parquet_artifact(df: "pd.DataFrame") -> tempfile.SpooledTemporaryFile:
+    pa = _require_pyarrow()
+    import pyarrow.parquet as pq
+
+    artifact = spooled_artifact()
+    pq.write_table(pa.Table.from_pandas(df, preserve_index=False), artifact)
+    return artifact
+
+
+def arrow_artifact(df: "pd.DataFrame") -> tempfile.SpooledTemporaryFile:
+    """Arrow IPC stream format, readable batch by batch by Spark/DuckDB/pyarrow"""
+    pa = _require_pyarrow()
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    artifact = spooled_artifact()
+    with pa.ipc.new_stream(artifact, table.schema) as writer:
+        writer.write_table(table)
+    return artifact
+
+
+def iter_csv(frames: Iterable["pd.DataFrame"]) -> Iterator[bytes]:
+    """CSV text of each frame as soon as it is available; the header comes with the first"""
+    for i, frame in enumerate(frames):
+        yield frame.to_csv(index=False, header=(i == 0)).encode("utf-8")
+
+
+def artifact_size(artifact: BinaryIO) -> int:
+    artifact.seek(0, os.SEEK_END)
+    return artifact.tell()
+
+
+def iter_artifact(artifact: BinaryIO, chunk_size: int = OUTPUT_CHUNK_SIZE) -> Iterator[bytes]:
+    """Streams an artifact in chunks, closing (and so deleting) it once done or abandoned"""
+    try:
+        artifact.seek(0)
+        while chunk := artifact.read(chunk_size):
+            yield chunk
+    finally:
+        artifact.close()
@@ -0,0 +1,251 @@
+"""
+Filters a processed report export without loading it whole.
+
+    python -m app.filters report.xlsx filtered.csv --where MajorType = Interchange --where Count '>=' 10
+
+The input (.xlsx, .csv, .parquet or a SQLite .db) is read a chunk of rows at
+a time, every chunk goes through one predicate built from all the rules, and
+matching rows are appended to the output (same formats) straight away, so
+memory stays flat however large the input is.
+"""
+import argparse
+import operator
+import os
+from typing import Callable, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine
+from sqlalchemy.pool import NullPool
+
+from .database import set_sqlite_pragmas
+from .exports import (
+    EXPORT_SQLITE_PRAGMAS, SHEET_NAME, SQLITE_TABLE_NAME, _header_cell, _insert_rows, column_widths
+)
+
+# Rows read, filtered and written per step
+CHUNK_ROWS = 50_000
+# Data rows an .xlsx sheet can hold below its header
+EXCEL_MAX_ROWS = 1_048_575
+
+OPERATORS = {
+    "=": operator.eq,
+    "!=": operator.ne,
+    ">": operator.gt,
+    "<": operator.lt,
+    ">=": operator.ge,
+    "<=": operator.le,
+}
+
+# (column, operation, value)
+Rule = Tuple[str, str, object]
+
+
+class FilterError(ValueError):
+    pass
+
+
+def parse_value(value: str):
+    """Numbers compare as numbers, anything else as text (as manual_test.py always did)"""
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
+def make_predicate(rules: Sequence[Rule]) -> Callable[[pd.DataFrame], np.ndarray]:
+    """
+    One boolean mask per chunk for all rules together: each rule narrows the
+    same mask in place instead of producing a filtered copy of the frame, and
+    once no row is left the remaining rules are skipped.
+    """
+    for _, op, _ in rules:
+        if op not in OPERATORS:
+            raise FilterError(f"Unsupported operation: {op} (use one of {' '.join(OPERATORS)})")
+
+    def predicate(chunk: pd.DataFrame) -> np.ndarray:
+        mask = np.ones(len(chunk), dtype=bool)
+        for column, op, value in rules:
+            if not mask.any():
+                break
+            if column not in chunk.columns:
+                raise FilterError(f"Unknown column: {column} (available: {', '.join(map(str, chunk.columns))})")
+            try:
+                matches = OPERATORS[op](chunk[column], value)
+            except TypeError:
+                raise FilterError(f"Can't compare {column} {op} {value!r}")
+            mask &= matches.to_numpy(dtype=bool, na_value=False)
+        return mask
+
+    return predicate
+
+
+# ========= CHUNKED READERS =========
+def _file_kind(path: str) -> str:
+    extension = os.path.splitext(path)[1].lower()
+    kinds = {".xlsx": "excel", ".csv": "csv", ".parquet": "parquet", ".db": "sqlite", ".sqlite": "sqlite"}
+    if extension not in kinds:
+        raise FilterError(f"Unsupported file type: {path} (use .xlsx, .csv, .parquet or .db)")
+    return kinds[extension]
+
+
+def _read_excel(path: str, chunk_rows: int, table: Optional[str]) -> Iterator[pd.DataFrame]:
+    from openpyxl import load_workbook
+
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        ws = wb[table] if table else wb.active
+        rows = ws.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = list(header)
+        padding = (None,) * len(columns)
+        chunk = []
+        for row in rows:
+            # Write-only workbooks (ours included) record no dimensions, so read-only
+            # rows stop at their last non-blank cell (e.g. an empty Reconciliation)
+            chunk.append(row + padding[len(row):])
+            if len(chunk) >= chunk_rows:
+                yield pd.DataFrame(chunk, columns=columns)
+                chunk = []
+        yield pd.DataFrame(chunk, columns=columns)
+    finally:
+        wb.close()
+
+
+def _read_csv(path: str, chunk_rows: int, table: Optional[str]) -> Iterator[pd.DataFrame]:
+    with pd.read_csv(path, chunksize=chunk_rows) as reader:
+        yield from reader
+
+
+def _read_parquet(path: str, chunk_rows: int, table: Optional[str]) -> Iterator[pd.DataFrame]:
+    import pyarrow.parquet as pq
+
+    with pq.ParquetFile(path) as source:
+        for batch in source.iter_batches(batch_size=chunk_rows):
+            yield batch.to_pandas()
+
+
+def _read_sqlite(path: str, chunk_rows: int, table: Optional[str]) -> Iterator[pd.DataFrame]:
+    engine = create_engine(f"sqlite:///{path}", poolclass=NullPool)
+    try:
+        with engine.connect() as conn:
+            yield from pd.read_sql_query(f'SELECT * FROM "{table or SQLITE_TABLE_NAME}"', conn,
+                                         chunksize=chunk_rows)
+    finally:
+        engine.dispose()
+
+
+READERS = {"excel": _read_excel, "csv": _read_csv, "parquet": _read_parquet, "sqlite": _read_sqlite}
+
+
+def read_chunks(path: str, chunk_rows: int = CHUNK_ROWS, table: Optional[str] = None) -> Iterator[pd.DataFrame]:
+    """Frames of at most `chunk_rows` rows; `table` is the sheet or SQLite table to read"""
+    return READERS[_file_kind(path)](path, chunk_rows, table)
+
+
+# ========= STREAMED WRITERS =========
+def _write_excel(chunks: Iterable[pd.DataFrame], path: str) -> int:
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(SHEET_NAME)
+    written = 0
+    for i, chunk in enumerate(chunks):
+        if i == 0:
+            # Widths have to be set before the first row; the first chunk stands in for the rest
+            for letter, width in column_widths(chunk).items():
+                ws.column_dimensions[letter].width = width
+            ws.append([_header_cell(ws, str(name)) for name in chunk.columns])
+        written += len(chunk)
+        if written > EXCEL_MAX_ROWS:
+            raise FilterError(f"More than {EXCEL_MAX_ROWS:,} matching rows; write .csv, .parquet or .db instead")
+        values = chunk.astype(object).where(chunk.notna(), None)
+        for row in values.itertuples(index=False, name=None):
+            ws.append(row)
+    wb.save(path)
+    return written
+
+
+def _write_csv(chunks: Iterable[pd.DataFrame], path: str) -> int:
+    written = 0
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        for i, chunk in enumerate(chunks):
+            chunk.to_csv(f, index=False, header=(i == 0))
+            written += len(chunk)
+    return written
+
+
+def _write_parquet(chunks: Iterable[pd.DataFrame], path: str) -> int:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    writer, written = None, 0
+    try:
+        for chunk in chunks:
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema)
+            elif table.schema != writer.schema:
+                # Chunk-wise type inference can differ (e.g. a column that is all blank in one chunk)
+                table = table.cast(writer.schema)
+            writer.write_table(table)
+            written += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+    return written
+
+
+def _write_sqlite(chunks: Iterable[pd.DataFrame], path: str) -> int:
+    if os.path.exists(path):
+        os.remove(path)
+    engine = create_engine(f"sqlite:///{path}", poolclass=NullPool)
+    set_sqlite_pragmas(engine, EXPORT_SQLITE_PRAGMAS)
+    written = 0
+    try:
+        with engine.begin() as conn:
+            for i, chunk in enumerate(chunks):
+                chunk.to_sql(SQLITE_TABLE_NAME, conn, if_exists="replace" if i == 0 else "append",
+                             index=False, method=_insert_rows)
+                written += len(chunk)
+    finally:
+        engine.dispose()
+    return written
+
+
+WRITERS = {"excel": _write_excel, "csv": _write_csv, "parquet": _write_parquet, "sqlite": _write_sqlite}
+
+
+def filter_file(source: str, target: str, rules: Sequence[Rule], chunk_rows: int = CHUNK_ROWS,
+                table: Optional[str] = None) -> int:
+    """Writes the rows of `source` matching every rule to `target`; returns how many matched"""
+    write = WRITERS[_file_kind(target)]
+    predicate = make_predicate(rules)
+    # Empty chunks still go through so the output gets its header and column types
+    matching = (chunk[predicate(chunk)] for chunk in read_chunks(source, chunk_rows, table))
+    return write(matching, target)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Filter a processed VSS-110 export chunk by chunk")
+    parser.add_argument("source", help=".xlsx, .csv, .parquet or SQLite .db file")
+    parser.add_argument("target", help="Output file; the format follows the extension")
+    parser.add_argument("--where", nargs=3, action="append", default=[], metavar=("COLUMN", "OP", "VALUE"),
+                        help=f"Keep rows where COLUMN OP VALUE, OP one of {' '.join(OPERATORS)}; repeatable")
+    parser.add_argument("--table", help=f"Sheet or SQLite table to read (default: first sheet / {SQLITE_TABLE_NAME})")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS,
+                        help="Rows processed at a time (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    rules = [(column, op, parse_value(value)) for column, op, value in args.where]
+    try:
+        written = filter_file(args.source, args.target, rules, args.chunk_rows, args.table)
+    except FilterError as e:
+        parser.exit(1, f"{parser.prog}: {e}\n")
+    print(f"{written} matching rows written to {args.target}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+import codecs
+import posixpath
+import shutil
+import tempfile
+import zipfile
+from contextlib import contextmanager
+from functools import partial
+from typing import BinaryIO, Callable, Iterable, Iterator, List, Optional, Tuple
+
+REPORT_DELIMITER = "*** END OF VSS-110 REPORT ***"
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+# Uploads copied by copy_upload stay in memory up to this size
+UPLOAD_SPOOL_MAX_BYTES = 8 * 1024 * 1024
+
+
+class ArchiveTooLarge(ValueError):
+    """A zip upload with more files, or more uncompressed bytes, than allowed"""
+
+
+class ReportScanner:
+    """
+    Incremental boundary scanner for VSS-110 bundles.
+
+    Text is fed in arbitrary pieces; every complete report (text up to the next
+    delimiter) is yielded as soon as its delimiter arrives. Only the unfinished
+    tail is kept between feeds, so memory is bounded by the largest report.
+    """
+
+    def __init__(self, delimiter: str = REPORT_DELIMITER):
+        self.delimiter = delimiter
+        self._buffer = ""
+        self._scan_from = 0
+
+    def feed(self, text: str) -> Iterator[str]:
+        if not text:
+            return
+        self._buffer += text
+        buffer, start = self._buffer, 0
+        while (pos := buffer.find(self.delimiter, max(start, self._scan_from))) >= 0:
+            report = buffer[start:pos].strip()
+            start = pos + len(self.delimiter)
+            if report:
+                yield report
+        self._buffer = buffer[start:]
+        # A delimiter may straddle two chunks, so rescan the last few characters
+        self._scan_from = max(0, len(self._buffer) - len(self.delimiter) + 1)
+
+    def close(self) -> Iterator[str]:
+        report = self._buffer.strip()
+        self._buffer, self._scan_from = "", 0
+        if report:
+            yield report
+
+
+def split_reports(content: str) -> Iterator[str]:
+    """Yields the stripped, non-empty reports of an in-memory bundle"""
+    for report in content.split(REPORT_DELIMITER):
+        report = report.strip()
+        if report:
+            yield report
+
+
+def iter_reports(chunks: Iterable[bytes], encoding: str = "utf-8") -> Iterator[str]:
+    """Decodes a stream of byte chunks and yields one report at a time"""
+    decoder = codecs.getincrementaldecoder(encoding)()
+    scanner = ReportScanner()
+    for chunk in chunks:
+        yield from scanner.feed(decoder.decode(chunk))
+    yield from scanner.feed(decoder.decode(b"", final=True))
+    yield from scanner.close()
+
+
+def iter_file_chunks(fileobj: BinaryIO, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+    while chunk := fileobj.read(chunk_size):
+        yield chunk
+
+
+def iter_file_reports(fileobj: BinaryIO, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[str]:
+    """Streams the reports of an uploaded (spooled) file without reading it whole"""
+    fileobj.seek(0)
+    return iter_reports(iter_file_chunks(fileobj, chunk_size))
+
+
+def count_file_reports(fileobj: BinaryIO, chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+    """
+    How many reports iter_file_reports will yield, counted by finding the
+    delimiter in the raw bytes: nothing is decoded or assembled, so this is a
+    cheap pass even over the largest uploads.
+    """
+    delimiter = REPORT_DELIMITER.encode("ascii")
+    # A delimiter may straddle two chunks, so the last few bytes are carried over
+    overlap = len(delimiter) - 1
+    fileobj.seek(0)
+    count, carry, has_text = 0, b"", False
+    while chunk := fileobj.read(chunk_size):
+        data, start = carry + chunk, 0
+        while (pos := data.find(delimiter, start)) >= 0:
+            # Blank stretches between delimiters are not reports
+            if has_text or data[start:pos].strip():
+                count += 1
+            has_text = False
+            start = pos + len(delimiter)
+        keep = max(start, len(data) - overlap)
+        has_text = has_text or bool(data[start:keep].strip())
+        carry = data[keep:]
+    if has_text or carry.strip():
+        count += 1
+    fileobj.seek(0)
+    return count
+
+
+def copy_upload(fileobj: BinaryIO) -> tempfile.SpooledTemporaryFile:
+    """
+    Private copy of an upload, for work that outlives the request handler
+    (the framework closes the original UploadFile as soon as the handler returns).
+    """
+    fileobj.seek(0)
+    copy = tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_MAX_BYTES, mode="w+b")
+    shutil.copyfileobj(fileobj, copy, DEFAULT_CHUNK_SIZE)
+    copy.seek(0)
+    return copy
+
+
+@contextmanager
+def upload_sources(
+    filename: str,
+    fileobj: BinaryIO,
+    max_members: Optional[int] = None,
+    max_expanded_bytes: Optional[int] = None
+) -> Iterator[List[Tuple[str, Callable[[], BinaryIO]]]]:
+    """
+    (source name, opener) pairs of an upload: the upload itself, or every file
+    inside it when it is a zip archive (named "<archive>/<member>"). Members of
+    one archive can be opened and read at the same time while the context is open.
+
+    Archives with more than `max_members` files or more than
+    `max_expanded_bytes` uncompressed raise ArchiveTooLarge before anything is
+    extracted. The sizes come from the archive's directory; a member never
+    yields more than its listed size (zipfile stops there and fails the CRC).
+    """
+    fileobj.seek(0)
+    if not zipfile.is_zipfile(fileobj):
+        yield [(filename, lambda: fileobj)]
+        return
+
+    fileobj.seek(0)
+    with zipfile.ZipFile(fileobj) as archive:
+        members = [
+            member for member in archive.infolist()
+            # Folders and the metadata files macOS adds to archives are not reports
+            if not member.is_dir()
+            and not member.filename.startswith("__MACOSX/")
+            and not posixpath.basename(member.filename).startswith(".")
+        ]
+        if max_members is not None and len(members) > max_members:
+            raise ArchiveTooLarge(f"{filename} holds {len(members):,} files, more than the {max_members:,} allowed")
+        expanded = sum(member.file_size for member in members)
+        if max_expanded_bytes is not None and expanded > max_expanded_bytes:
+            raise ArchiveTooLarge(
+                f"{filename} expands to {expanded:,} bytes, more than the {max_expanded_bytes:,} allowed"
+            )
+        yield [(f"{filename}/{member.filename}", partial(archive.open, member)) for member in members]
@@ -0,0 +1,194 @@
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, Callable, Dict, Optional
+
+from .config import JOB_DIR, JOB_QUEUE_MAX, JOB_TTL_SECONDS, JOB_WORKERS
+
+logger = logging.getLogger(__name__)
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+def _remove(path: Optional[str]):
+    if path:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+class QueueFull(Exception):
+    """Raised by JobQueue.submit when `max_pending` jobs are already queued or running"""
+
+
+class Job:
+    """
+    One upload processed in the background.
+
+    The worker updates the progress fields as it goes; readers only ever see
+    them through `snapshot`, taken under the job's lock.
+    """
+
+    def __init__(self, job_id: str, upload_path: str, filename: Optional[str], output: str):
+        self.id = job_id
+        self.upload_path = upload_path
+        self.filename = filename
+        self.output = output
+        self.status = QUEUED
+        self.reports_total: Optional[int] = None
+        self.reports_parsed = 0
+        self.error: Optional[str] = None
+        # validation.reconciliation_summary of the result, once done
+        self.reconciliation: Optional[Dict] = None
+        # Set before the result file is written; it is only complete once the job is done
+        self.result_path: Optional[str] = None
+        self.result_filename: Optional[str] = None
+        self.media_type: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def update(self, **fields):
+        with self._lock:
+            for name, value in fields.items():
+                setattr(self, name, value)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                "id": self.id,
+                "status": self.status,
+                "output": self.output,
+                "filename": self.filename,
+                "reports_parsed": self.reports_parsed,
+                "reports_total": self.reports_total,
+                "error": self.error,
+                "reconciliation": self.reconciliation,
+                "created_at": self.created_at,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+            }
+
+    def remove_result(self):
+        """Deletes the result file, complete or not"""
+        with self._lock:
+            path, self.result_path = self.result_path, None
+        _remove(path)
+
+    def remove_files(self):
+        _remove(self.upload_path)
+        self.remove_result()
+
+
+class JobQueue:
+    """
+    Background processing of spooled uploads on a bounded thread pool.
+
+    Submitting only records the job and queues it, so the request returns at
+    once; at most `workers` jobs run at the same time and at most `max_pending`
+    are queued or running. Finished jobs are kept for `ttl` seconds so their
+    result can be fetched, then removed with their files.
+    """
+
+    def __init__(self, workers: int = JOB_WORKERS, directory: Optional[str] = JOB_DIR, ttl: int = JOB_TTL_SECONDS,
+                 max_pending: int = JOB_QUEUE_MAX):
+        self.workers = max(1, workers)
+        self.directory = directory or os.path.join(tempfile.gettempdir(), "visa-jobs")
+        self.ttl = ttl
+        self.max_pending = max_pending
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                os.makedirs(self.directory, exist_ok=True)
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="visa-job")
+            return self._executor
+
+    def path(self, job_id: str, extension: str) -> str:
+        return os.path.join(self.directory, f"{job_id}.{extension}")
+
+    def spool(self, fileobj: BinaryIO, chunk_size: int = 1024 * 1024) -> str:
+        """Copies an upload into the job directory; returns the new job id"""
+        self._get_executor()
+        job_id = uuid.uuid4().hex
+        fileobj.seek(0)
+        with open(self.path(job_id, "upload"), "wb") as target:
+            shutil.copyfileobj(fileobj, target, chunk_size)
+        return job_id
+
+    def _pending(self) -> int:
+        # Caller holds self._lock
+        return sum(1 for job in self._jobs.values() if job.finished_at is None)
+
+    def pending(self) -> int:
+        """Jobs queued or running"""
+        with self._lock:
+            return self._pending()
+
+    def full(self) -> bool:
+        return self.pending() >= self.max_pending
+
+    def submit(self, job_id: str, filename: Optional[str], output: str, run: Callable[[Job], None]) -> Job:
+        """Queues `run(job)` for a spooled upload; raises QueueFull (removing the upload) when at capacity"""
+        self.purge_expired()
+        job = Job(job_id, self.path(job_id, "upload"), filename, output)
+        with self._lock:
+            if self._pending() >= self.max_pending:
+                job.remove_files()
+                raise QueueFull(f"{self.max_pending} jobs are already queued or running")
+            self._jobs[job_id] = job
+        self._get_executor().submit(self._run, job, run)
+        return job
+
+    def _run(self, job: Job, run: Callable[[Job], None]):
+        job.update(status=RUNNING, started_at=time.time())
+        try:
+            run(job)
+        except Exception as e:
+            logger.exception("Job %s failed", job.id)
+            # Whatever part of the result was written is of no use
+            job.remove_result()
+            job.update(status=FAILED, error=str(e), finished_at=time.time())
+        else:
+            job.update(status=DONE, finished_at=time.time())
+        finally:
+            # The upload is not needed any more, whatever happened
+            _remove(job.upload_path)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        self.purge_expired()
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def purge_expired(self):
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            expired = [job for job in self._jobs.values()
+                       if job.finished_at is not None and job.finished_at < cutoff]
+            for job in expired:
+                del self._jobs[job.id]
+        for job in expired:
+            job.remove_files()
+
+    def shutdown(self):
+        """Stops the workers, dropping queued jobs, and deletes every job file"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+            jobs, self._jobs = list(self._jobs.values()), {}
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+        for job in jobs:
+            job.remove_files()
+
+
+job_queue = JobQueue()
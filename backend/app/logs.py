@@ -0,0 +1,73 @@
+import atexit
+import logging
+import logging.handlers
+import queue
+import sys
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+from .config import LOG_LEVEL, LOG_TRACE
+
+APP_LOGGER_NAME = "app"
+# Per-field parser output; only written while tracing is on
+TRACE_LOGGER_NAME = "app.trace"
+LOG_FORMAT = "%(asctime)s %(levelname)s %(processName)s %(name)s: %(message)s"
+
+trace_logger = logging.getLogger(TRACE_LOGGER_NAME)
+
+_trace: ContextVar[bool] = ContextVar("visa_trace", default=LOG_TRACE)
+_listener: Optional[logging.handlers.QueueListener] = None
+_handler: Optional[logging.handlers.QueueHandler] = None
+
+
+def trace_enabled() -> bool:
+    """Whether the current request (or worker task) asked for per-field tracing"""
+    return _trace.get()
+
+
+@contextmanager
+def tracing(enabled: bool) -> Iterator[None]:
+    token = _trace.set(enabled)
+    try:
+        yield
+    finally:
+        _trace.reset(token)
+
+
+def configure_logging(level: str = LOG_LEVEL):
+    """
+    Routes the application loggers through a queue.
+
+    Callers only pay for putting a record on the queue; formatting and the
+    actual stream write happen on the listener thread. Safe to call more than
+    once, and used as the initializer of parser worker processes.
+    """
+    global _listener, _handler
+    if _listener is not None:
+        return
+
+    records: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    stream = logging.StreamHandler(sys.stderr)
+    stream.setFormatter(logging.Formatter(LOG_FORMAT))
+
+    app_logger = logging.getLogger(APP_LOGGER_NAME)
+    app_logger.setLevel(level)
+    _handler = logging.handlers.QueueHandler(records)
+    app_logger.addHandler(_handler)
+    app_logger.propagate = False
+    # Trace records are gated by trace_enabled(), not by the application level
+    trace_logger.setLevel(logging.DEBUG)
+
+    _listener = logging.handlers.QueueListener(records, stream)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """Flushes queued records and stops the listener thread"""
+    global _listener, _handler
+    if _listener is not None:
+        logging.getLogger(APP_LOGGER_NAME).removeHandler(_handler)
+        _listener.stop()
+        _listener, _handler = None, None
@@ -1,12 +1,30 @@
+import logging
+
 from fastapi import FastAPI
 from fastapi import UploadFile, File
+from fastapi import Response
 from fastapi.middleware.cors import CORSMiddleware
-from .routes import router
+from .routes import POOLED_PATHS, router
+from .config import MIGRATE_ON_STARTUP, WARMUP
 from .database import engine
-from .models import VisaReportLine
+from .migrations import migrate
+from .parallel import shutdown_parse_executor
+from .jobs import job_queue
+from .admission import AdmissionControl, UploadSizeLimit, check_upload_size, processing_pool
+from .logs import configure_logging, shutdown_logging
+from .metrics import PROMETHEUS_MEDIA_TYPE, render_metrics
+from .warmup import start_warmup, warmup
+
+logger = logging.getLogger(__name__)
 
 app = FastAPI()
 
+# Uploads beyond the processing pool's capacity get a 429, and oversized uploads
+# (from their Content-Length) a 413, before the body is read; added first so the
+# CORS middleware still wraps those answers
+app.add_middleware(AdmissionControl, paths=POOLED_PATHS)
+app.add_middleware(UploadSizeLimit)
+
 # CORS Configuration
 origins = [
     "http://localhost:3000",  # React default
@@ -25,17 +43,39 @@ app.add_middleware(
 
 @app.on_event("startup")
 def on_startup():
-    # Create all tables defined in models.py
-    VisaReportLine.__table__.create(bind=engine, checkfirst=True)
+    configure_logging()
+    # Create all tables defined in models.py and apply pending schema revisions
+    if MIGRATE_ON_STARTUP:
+        migrate(engine)
+    # pandas/openpyxl are not imported with the app; load them now rather than on the first upload
+    if WARMUP == "startup":
+        warmup()
+    elif WARMUP == "background":
+        start_warmup()
+
+@app.on_event("shutdown")
+def on_shutdown():
+    # Background jobs use the parser pool, so they go first
+    job_queue.shutdown()
+    processing_pool.shutdown()
+    # Stop the parser process pool, if one was started
+    shutdown_parse_executor()
+    shutdown_logging()
 
 @app.get("/")
 async def root():
     return {"message": "Hello World"}
 
+@app.get("/metrics")
+def metrics():
+    # Prometheus scrape target; counters are per worker process
+    return Response(render_metrics(), media_type=PROMETHEUS_MEDIA_TYPE)
+
 @app.post("/upload")
 async def upload_file(file: UploadFile = File(...)):
-    print(f"Received file: {file.filename}")
-    contents = await file.read()
+    # The upload is already spooled by the framework; it is not read into memory here
+    check_upload_size(file.size)
+    logger.info("Received file: %s", file.filename)
     return {"filename": file.filename}
 
 
@@ -0,0 +1,144 @@
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+PROMETHEUS_MEDIA_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+BYTES_BUCKETS = tuple(1024 * 4 ** i for i in range(11))  # 1 KiB .. 1 GiB
+REPORTS_BUCKETS = (1, 10, 50, 100, 500, 1000, 5000, 10000, 50000)
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter, optionally split by label values"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        # An unlabelled counter is reported as 0 before its first increment
+        self._values: Dict[Tuple[str, ...], float] = {} if self.labelnames else {(): 0}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_labels(self.labelnames, key)} {_number(value)}" for key, value in values]
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus sense"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, buckets: Sequence[float], labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # label values -> (count per bucket, sum)
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        slot = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.setdefault(key, ([0] * len(self.buckets), [0.0]))
+            counts[slot] += 1
+            total[0] += value
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = sorted((key, (list(counts), total[0])) for key, (counts, total) in self._values.items())
+        lines = []
+        for key, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                le = f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+# ========= INGESTION PIPELINE METRICS =========
+STAGE_SECONDS = Histogram(
+    "visa_stage_duration_seconds", "Time spent per pipeline stage of an upload", SECONDS_BUCKETS, ["stage"]
+)
+UPLOAD_BYTES = Histogram("visa_upload_size_bytes", "Size of uploaded bundles", BYTES_BUCKETS)
+UPLOAD_REPORTS = Histogram("visa_upload_reports", "Reports per uploaded bundle", REPORTS_BUCKETS)
+UPLOADS = Counter("visa_uploads_total", "Processed uploads by output format", ["output"])
+REPORTS_PARSED = Counter("visa_reports_parsed_total", "Reports parsed successfully")
+PARSE_FAILURES = Counter("visa_report_parse_failures_total", "Reports that failed to parse or convert")
+RECONCILIATION_FAILURES = Counter("visa_report_reconciliation_failures_total",
+                                  "Reports whose lines don't add up to their totals")
+ROWS_STORED = Counter("visa_report_lines_stored_total", "Report lines written to visa_report_lines")
+
+REGISTRY = [STAGE_SECONDS, UPLOAD_BYTES, UPLOAD_REPORTS, UPLOADS, REPORTS_PARSED, PARSE_FAILURES,
+            RECONCILIATION_FAILURES, ROWS_STORED]
+
+
+def render_metrics() -> str:
+    """Every registered metric in the Prometheus text exposition format (this process only)"""
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f"# HELP {metric.name} {metric.help_text}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.samples())
+    return "\n".join(lines) + "\n"
+
+
+class StageTimer:
+    """
+    Durations of the stages of one upload.
+
+    Stages can be entered several times (e.g. once per streamed batch); their
+    time adds up. `observe` feeds the totals into STAGE_SECONDS once the upload
+    is done, and `server_timing` renders them as a Server-Timing header.
+    """
+
+    def __init__(self):
+        self.durations: Dict[str, float] = {}
+
+    def add(self, stage: str, seconds: float):
+        self.durations[stage] = self.durations.get(stage, 0.0) + seconds
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def observe(self):
+        for stage, seconds in self.durations.items():
+            STAGE_SECONDS.observe(seconds, stage=stage)
+
+    def server_timing(self) -> str:
+        return ", ".join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in self.durations.items())
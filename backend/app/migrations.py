@@ -0,0 +1,181 @@
+from sqlalchemy import Column, Integer, MetaData, Table, inspect, select, text
+from sqlalchemy.schema import CreateTable
+from sqlalchemy.engine import Connection, Engine
+
+from .database import Base
+
+# Applied schema revision, one row holding the highest version
+schema_version = Table(
+    "schema_version", MetaData(),
+    Column("version", Integer, nullable=False),
+)
+
+
+def _add_missing_columns(conn: Connection, table_name: str, columns: dict):
+    existing = {col["name"] for col in inspect(conn).get_columns(table_name)}
+    for name, ddl_type in columns.items():
+        if name not in existing:
+            conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {name} {ddl_type}"))
+
+
+def _create_missing_indexes(conn: Connection, table):
+    """Indexes over columns a later revision adds are left to that revision"""
+    existing = {ix["name"] for ix in inspect(conn).get_indexes(table.name)}
+    columns = {col["name"] for col in inspect(conn).get_columns(table.name)}
+    for index in table.indexes:
+        if index.name not in existing and {col.name for col in index.columns} <= columns:
+            index.create(bind=conn)
+
+
+def _v1_report_identity(conn: Connection):
+    """visa_report_lines gains the report identity columns used for idempotent re-uploads"""
+    from .models import VisaReportLine
+
+    _add_missing_columns(conn, "visa_report_lines", {
+        "reporting_for": "VARCHAR",
+        "settlement_currency": "VARCHAR",
+    })
+    _create_missing_indexes(conn, VisaReportLine.__table__)
+
+
+def _v2_line_query_indexes(conn: Connection):
+    """Lookup indexes for the /reports/lines filters (superseded by revision 5)"""
+    from .models import VisaReportLine
+
+    _create_missing_indexes(conn, VisaReportLine.__table__)
+
+
+MIGRATION_BATCH_SIZE = 5000
+
+
+def _v3_typed_dates_and_amounts(conn: Connection):
+    """
+    proc_date/report_date become DATE and amounts become integer minor units.
+
+    Column types can't be altered in place on SQLite, so the table is rebuilt:
+    rows are copied in id-ordered batches into a new table, converting as they
+    go, then the tables are swapped and the indexes recreated.
+    """
+    from .models import VisaReportLine
+    from .storage import parse_report_date, to_minor_units
+
+    table = VisaReportLine.__table__
+    columns = {col["name"] for col in inspect(conn).get_columns(table.name)}
+    if "credit_minor" in columns:
+        return  # created with the current schema
+
+    old = Table(table.name, MetaData(), autoload_with=conn)
+    new = table.to_metadata(MetaData(), name=f"{table.name}_new")
+    conn.execute(CreateTable(new))
+
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            select(old).where(old.c.id > last_id).order_by(old.c.id).limit(MIGRATION_BATCH_SIZE)
+        ).mappings().all()
+        if not rows:
+            break
+        conn.execute(new.insert(), [
+            {
+                "id": row["id"],
+                "report_id": row["report_id"],
+                "reporting_for": row["reporting_for"],
+                "settlement_currency": row["settlement_currency"],
+                "proc_date": parse_report_date(row["proc_date"]),
+                "report_date": parse_report_date(row["report_date"]),
+                "major_type": row["major_type"],
+                "minor_type": row["minor_type"],
+                "count": row["count"],
+                "credit_minor": to_minor_units(row["credit_amount"]),
+                "debit_minor": to_minor_units(row["debit_amount"]),
+                "total_minor": to_minor_units(row["total_amount"]),
+                "crdb_label": row["crdb_label"],
+            }
+            for row in rows
+        ])
+        last_id = rows[-1]["id"]
+
+    old.drop(bind=conn)
+    conn.execute(text(f"ALTER TABLE {new.name} RENAME TO {table.name}"))
+    _create_missing_indexes(conn, table)
+
+
+def _v4_daily_settlement_rollup(conn: Connection):
+    """Backfills daily_settlement_rollup (created by create_all) from the stored lines"""
+    from .models import DailySettlementRollup
+    from .storage import ROLLUP_KEY, ROLLUP_SUMS, rollup_select
+
+    rollup = DailySettlementRollup.__table__
+    if conn.execute(select(rollup).limit(1)).first() is None:
+        conn.execute(rollup.insert().from_select(ROLLUP_KEY + ROLLUP_SUMS, rollup_select()))
+
+
+# Revision 2 lookup indexes, replaced by one (column, id) index per filter column in revision 5
+SUPERSEDED_LINE_INDEXES = (
+    "ix_visa_report_lines_report_date",
+    "ix_visa_report_lines_proc_date_type",
+    "ix_visa_report_lines_type_proc_date",
+    "ix_visa_report_lines_crdb_proc_date",
+)
+
+
+def _v5_line_filter_indexes(conn: Connection):
+    """/reports/lines indexes that serve both the filter and the keyset order"""
+    from .models import VisaReportLine
+
+    for name in SUPERSEDED_LINE_INDEXES:
+        conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+    _create_missing_indexes(conn, VisaReportLine.__table__)
+
+
+def _v6_full_report_key(conn: Connection):
+    """
+    The rest of the report header joins the report key, so reports that only
+    differ there are stored side by side. Rows stored before this revision keep
+    NULL in the new columns (storage matches them on the rest of the key).
+    """
+    from .models import VisaReportLine
+
+    _add_missing_columns(conn, "visa_report_lines", {
+        "transaction_type": "VARCHAR",
+        "rollup_to": "VARCHAR",
+        "funds_xfer_entity": "VARCHAR",
+    })
+    conn.execute(text("DROP INDEX IF EXISTS ux_visa_report_lines_line_key"))
+    _create_missing_indexes(conn, VisaReportLine.__table__)
+
+
+# Ordered revisions; each one must be safe to run against a freshly created schema
+MIGRATIONS = [
+    _v1_report_identity,
+    _v2_line_query_indexes,
+    _v3_typed_dates_and_amounts,
+    _v4_daily_settlement_rollup,
+    _v5_line_filter_indexes,
+    _v6_full_report_key,
+]
+
+
+def migrate(engine: Engine):
+    """Creates missing tables and applies any pending schema revisions"""
+    from . import models  # noqa: F401  (registers the tables on Base)
+
+    with engine.begin() as conn:
+        Base.metadata.create_all(bind=conn, checkfirst=True)
+        schema_version.create(bind=conn, checkfirst=True)
+        current = conn.execute(schema_version.select()).scalar() or 0
+
+        for version, migration in enumerate(MIGRATIONS, start=1):
+            if version > current:
+                migration(conn)
+
+        if current < len(MIGRATIONS):
+            conn.execute(schema_version.delete())
+            conn.execute(schema_version.insert().values(version=len(MIGRATIONS)))
+
+
+if __name__ == "__main__":
+    # Once per deploy, ahead of workers started with VISA_MIGRATE_ON_STARTUP=0
+    from .database import engine
+
+    migrate(engine)
@@ -1,17 +1,59 @@
-from sqlalchemy import Column, Integer, Float, String
+from sqlalchemy import Column, Integer, BigInteger, Date, String, Index
 from .database import Base
 
+# Columns GET /reports/lines can filter on
+FILTER_COLUMNS = (
+    "report_id", "reporting_for", "settlement_currency", "proc_date", "report_date", "major_type", "minor_type",
+    "count", "credit_minor", "debit_minor", "total_minor", "crdb_label",
+)
+
+
 class VisaReportLine(Base):
     __tablename__ = "visa_report_lines"
 
     id = Column(Integer, primary_key=True, index=True)
     report_id = Column(String)
-    proc_date = Column(String)
-    report_date = Column(String)
+    reporting_for = Column(String)
+    transaction_type = Column(String)
+    rollup_to = Column(String)
+    funds_xfer_entity = Column(String)
+    settlement_currency = Column(String)
+    proc_date = Column(Date)
+    report_date = Column(Date)
     major_type = Column(String)
     minor_type = Column(String)
     count = Column(Integer)
-    credit_amount = Column(Float)
-    debit_amount = Column(Float)
-    total_amount = Column(Float)
-    crdb_label = Column(String)
\ No newline at end of file
+    # Amounts in minor units (cents) so sums stay exact
+    credit_minor = Column(BigInteger)
+    debit_minor = Column(BigInteger)
+    total_minor = Column(BigInteger)
+    crdb_label = Column(String)
+
+    __table_args__ = (
+        # One row per line of a report; re-uploads replace rows on this key
+        Index(
+            "ux_visa_report_lines_report_line",
+            "report_id", "reporting_for", "settlement_currency", "proc_date",
+            "transaction_type", "rollup_to", "funds_xfer_entity",
+            "major_type", "minor_type",
+            unique=True,
+        ),
+        # GET /reports/lines seeks on, and pages in the order of, (filter column, id)
+        *(Index(f"ix_visa_report_lines_{column}_id", column, "id") for column in FILTER_COLUMNS),
+    )
+
+
+class DailySettlementRollup(Base):
+    """Per-day totals of visa_report_lines, kept up to date as reports are ingested"""
+    __tablename__ = "daily_settlement_rollup"
+
+    proc_date = Column(Date, primary_key=True)
+    settlement_currency = Column(String, primary_key=True)
+    major_type = Column(String, primary_key=True)
+    minor_type = Column(String, primary_key=True)
+    line_count = Column(Integer, nullable=False, default=0)
+    count = Column(BigInteger, nullable=False, default=0)
+    credit_minor = Column(BigInteger, nullable=False, default=0)
+    debit_minor = Column(BigInteger, nullable=False, default=0)
+    # Signed total: CR lines add, DB lines subtract
+    net_minor = Column(BigInteger, nullable=False, default=0)
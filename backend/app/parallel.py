@@ -0,0 +1,122 @@
+import logging
+import multiprocessing
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .cache import ParseCache, parse_cache, report_key
+from .config import PARSE_CHUNK_SIZE, PARSE_WORKERS
+from .logs import configure_logging, trace_enabled, trace_logger, tracing
+from .parser import ParsedReport, extract_visa_report
+
+# (report index, extracted report or None, error message or None)
+ParseResult = Tuple[int, Optional[ParsedReport], Optional[str]]
+
+logger = logging.getLogger(__name__)
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def get_parse_executor() -> Optional[ProcessPoolExecutor]:
+    """Returns the shared parser pool, or None when parsing runs in-process"""
+    global _executor
+    if PARSE_WORKERS <= 0:
+        return None
+    if _executor is None:
+        # spawn: forking a threaded uvicorn worker is not safe
+        _executor = ProcessPoolExecutor(
+            max_workers=PARSE_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=configure_logging,
+        )
+    return _executor
+
+
+def shutdown_parse_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(cancel_futures=True)
+        _executor = None
+
+
+def _parse_one(idx: int, report_text: str) -> ParseResult:
+    if trace_enabled():
+        trace_logger.debug("Processing report #%d", idx + 1)
+    try:
+        return idx, extract_visa_report(report_text), None
+    except Exception as e:
+        return idx, None, str(e)
+
+
+def _parse_chunk(chunk: List[Tuple[int, str]], trace: bool = False) -> List[ParseResult]:
+    # The trace switch is passed explicitly: context variables do not reach worker processes
+    with tracing(trace):
+        return [_parse_one(idx, report_text) for idx, report_text in chunk]
+
+
+def _finish_chunk(chunk: List[Tuple[int, str]], cached: Dict[int, ParsedReport], keys: Dict[int, str],
+                  results, cache: Optional[ParseCache]) -> Iterator[ParseResult]:
+    """Merges cache hits with freshly parsed reports, back in report order"""
+    if isinstance(results, Future):
+        results = results.result()
+    parsed = iter(results)
+    for idx, _ in chunk:
+        if idx in cached:
+            yield idx, cached[idx], None
+            continue
+        result = next(parsed)
+        if cache is not None and result[1] is not None:
+            # The cache keeps the flat dict form, which is also what its JSON files hold
+            cache.put(keys[idx], result[1].to_dict())
+        yield result
+
+
+def parse_reports(
+    reports: Iterable[str],
+    executor: Optional[Executor] = None,
+    chunk_size: int = PARSE_CHUNK_SIZE,
+    cache: Optional[ParseCache] = parse_cache,
+    trace: Optional[bool] = None,
+    workers: int = PARSE_WORKERS,
+) -> Iterator[ParseResult]:
+    """
+    Parses a stream of reports, yielding results in the original order.
+
+    Reports whose text is already in the cache are not parsed again. With an
+    executor the rest are sent out in chunks, keeping only a couple of chunks
+    per worker (`workers`, the executor's size) in flight so a streamed upload
+    is never fully buffered.
+    `trace` defaults to the tracing switch in effect when iteration starts.
+    """
+    if trace is None:
+        trace = trace_enabled()
+    numbered = enumerate(reports)
+    if executor is None:
+        chunk_size, max_in_flight = 1, 1
+    else:
+        max_in_flight = 2 * max(1, workers)
+
+    pending = deque()
+    while chunk := list(islice(numbered, chunk_size)):
+        cached, keys = {}, {}
+        if cache is not None:
+            for idx, report_text in chunk:
+                keys[idx] = report_key(report_text)
+                if (data := cache.get(keys[idx])) is not None:
+                    logger.debug("Report #%d unchanged, using cached parse", idx + 1)
+                    cached[idx] = ParsedReport.from_dict(data)
+        misses = [item for item in chunk if item[0] not in cached]
+
+        if not misses:
+            results = []
+        elif executor is None:
+            results = _parse_chunk(misses, trace)
+        else:
+            results = executor.submit(_parse_chunk, misses, trace)
+        pending.append((chunk, cached, keys, results))
+
+        if len(pending) >= max_in_flight:
+            yield from _finish_chunk(*pending.popleft(), cache)
+    while pending:
+        yield from _finish_chunk(*pending.popleft(), cache)
@@ -0,0 +1,325 @@
+import re
+from typing import Dict, List, Optional, Tuple
+
+from .logs import trace_enabled, trace_logger
+
+
+# ========= PRECOMPILED VSS-110 PATTERNS =========
+AMOUNT = r'([\d,]+\.\d{2}(?:CR|DB)?)'
+COUNT = r'([\d,]+)'
+
+# Header fields: (data key, literal marker used as a cheap pre-check, pattern)
+HEADER_PATTERNS = [
+    ('ReportID', 'REPORT ID:', re.compile(r'REPORT ID:\s+(VSS-\d+)')),
+    ('ReportingFor', 'REPORTING FOR:', re.compile(r'REPORTING FOR:\s+(.+?)\s+PROC')),
+    ('RollupTo', 'ROLLUP TO:', re.compile(r'ROLLUP TO:\s+(.+?)\s+SETTLEMENT')),
+    ('FundsXferEntity', 'FUNDS XFER ENTITY:', re.compile(r'FUNDS XFER ENTITY:\s+(.+)')),
+    ('ProcDate', 'PROC DATE:', re.compile(r'PROC DATE:\s+(\d{2}[A-Za-z]{3}\d{2})')),
+    ('ReportDate', 'REPORT DATE:', re.compile(r'REPORT DATE:\s+(\d{2}[A-Za-z]{3}\d{2})')),
+    ('SettlementCurrency', 'SETTLEMENT CURRENCY:', re.compile(r'SETTLEMENT CURRENCY:\s+([A-Z]{3})')),
+]
+
+HEADER_FIELDS = frozenset(field for field, _, _ in HEADER_PATTERNS)
+HEADER_INDEX = {field: i for i, (field, _, _) in enumerate(HEADER_PATTERNS)}
+
+LINE_TYPES = ['ACQUIRER', 'ISSUER', 'OTHER']
+
+# One entry per output line of a report: (MajorType, MinorType, field name prefix, has count)
+ROW_LAYOUT: List[Tuple[str, str, str, bool]] = (
+    [('Interchange', minor, f"Interchange_{minor}", True)
+     for minor in LINE_TYPES + ['Total']]
+    + [(major, minor, f"{major}_{minor}", False)
+       for major in ['Reimbursement', 'VisaCharges']
+       for minor in LINE_TYPES + ['Total']]
+    + [('FinalTotal', minor, f"FinalTotal_{minor}", False)
+       for minor in LINE_TYPES]
+    + [('Settlement', 'Net Settlement Amount', 'Settlement_Net', False)]
+)
+LINE_INDEX = {prefix: i for i, (_, _, prefix, _) in enumerate(ROW_LAYOUT)}
+ROWS_PER_REPORT = len(ROW_LAYOUT)
+# Blank line field: the line is missing from the report (the patterns never capture '')
+MISSING = ''
+# Version of what extract_visa_report / ParsedReport.to_dict produce. It is part
+# of the parse cache key, so bump it whenever either changes (a parser fix
+# included): entries cached by the old code, on disk too, are then never served.
+PARSE_FORMAT_VERSION = 1
+
+
+class ParsedReport:
+    """
+    One extracted VSS-110 report.
+
+    Header values sit in `headers`, in HEADER_PATTERNS order (None when absent).
+    Amounts and counts sit in four parallel lists with one position per
+    ROW_LAYOUT line, so nothing is looked up by building key strings; a line
+    the report doesn't have is MISSING in all four, as is the count of lines
+    without one. Values are the captured strings (e.g. '4,845.52CR') unless
+    the record was built from an already decoded dict.
+    """
+
+    __slots__ = ('headers', 'count', 'credit', 'debit', 'total')
+
+    def __init__(self):
+        self.headers: List[Optional[str]] = [None] * len(HEADER_PATTERNS)
+        self.count: List = [MISSING] * len(ROW_LAYOUT)
+        self.credit: List = [MISSING] * len(ROW_LAYOUT)
+        self.debit: List = [MISSING] * len(ROW_LAYOUT)
+        self.total: List = [MISSING] * len(ROW_LAYOUT)
+
+    def header(self, field: str, default=None):
+        value = self.headers[HEADER_INDEX[field]]
+        return default if value is None else value
+
+    def set_line(self, index: int, groups: Tuple[str, ...], has_count: bool):
+        if has_count:
+            self.count[index] = groups[0]
+            groups = groups[1:]
+        self.credit[index], self.debit[index], self.total[index] = groups
+
+    def to_dict(self) -> Dict:
+        """
+        The flat dict the parser used to return: the header fields found, then
+        '<Section>_<Line>_<Field>' keys for every line found, in report order
+        """
+        data = {field: value for (field, _, _), value in zip(HEADER_PATTERNS, self.headers) if value is not None}
+        for i, (_, _, prefix, has_count) in enumerate(ROW_LAYOUT):
+            if self.credit[i] == MISSING:
+                continue
+            if has_count:
+                data[f"{prefix}_Count"] = self.count[i]
+            data[f"{prefix}_CreditAmount"] = self.credit[i]
+            data[f"{prefix}_DebitAmount"] = self.debit[i]
+            data[f"{prefix}_TotalAmount"] = self.total[i]
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'ParsedReport':
+        """Record for a flat dict as returned by to_dict or parse_visa_report"""
+        report = cls()
+        report.headers = [data.get(field) for field, _, _ in HEADER_PATTERNS]
+        get = data.get
+        for i, (_, _, prefix, has_count) in enumerate(ROW_LAYOUT):
+            if has_count:
+                report.count[i] = get(f"{prefix}_Count", MISSING)
+            report.credit[i] = get(f"{prefix}_CreditAmount", MISSING)
+            report.debit[i] = get(f"{prefix}_DebitAmount", MISSING)
+            report.total[i] = get(f"{prefix}_TotalAmount", MISSING)
+        return report
+
+
+def _line_pattern(label: str, has_count: bool) -> 're.Pattern':
+    fields = [COUNT, AMOUNT, AMOUNT, AMOUNT] if has_count else [AMOUNT, AMOUNT, AMOUNT]
+    return re.compile(re.escape(label) + r'\s+' + r'\s+'.join(fields))
+
+
+class _Section:
+    """A report section bounded by a start and an end marker"""
+
+    def __init__(self, name: str, start: str, end: str, total_label: str, has_count: bool):
+        self.name = name
+        self.start = start
+        self.end = end
+        self.total_label = total_label
+        self.has_count = has_count
+        self.line_patterns = [
+            (line_type, 'TOTAL ' + line_type, _line_pattern('TOTAL ' + line_type, has_count))
+            for line_type in LINE_TYPES
+        ]
+        self.total_pattern = _line_pattern(total_label, has_count)
+        # ParsedReport positions of the section's lines and of its total
+        self.line_indexes = [LINE_INDEX[f"{name}_{line_type}"] for line_type in LINE_TYPES]
+        self.total_index = LINE_INDEX[f"{name}_Total"]
+
+
+SECTIONS = [
+    _Section('Interchange', 'INTERCHANGE VALUE', 'REIMBURSEMENT FEES', 'TOTAL INTERCHANGE VALUE', True),
+    _Section('Reimbursement', 'REIMBURSEMENT FEES', 'VISA CHARGES', 'TOTAL REIMBURSEMENT FEES', False),
+    _Section('VisaCharges', 'VISA CHARGES', 'TOTAL VISA CHARGES', 'TOTAL VISA CHARGES', False),
+]
+
+# The TOTAL block right before NET SETTLEMENT AMOUNT: three full lines, in order
+FINAL_TOTAL_PATTERN = re.compile(
+    r'^\s*TOTAL\s+(ACQUIRER|ISSUER|OTHER)\s+([\d,]+\.\d{2}[A-Z]*)\s+([\d,]+\.\d{2}[A-Z]*)\s+([\d,]+\.\d{2}[A-Z]*)\s*$'
+)
+NET_SETTLEMENT_MARKER = 'NET SETTLEMENT AMOUNT'
+NET_SETTLEMENT_PATTERN = _line_pattern(NET_SETTLEMENT_MARKER, False)
+FINAL_TOTAL_INDEXES = [LINE_INDEX[f"FinalTotal_{line_type}"] for line_type in LINE_TYPES]
+NET_SETTLEMENT_INDEX = LINE_INDEX["Settlement_Net"]
+
+
+def _amount_value(amount_str) -> float:
+    if not amount_str or str(amount_str).strip() in ('', '0.00'):
+        return 0.0
+    amount_str = str(amount_str).replace(',', '').strip()
+    if 'CR' in amount_str:
+        return float(amount_str.replace('CR', ''))
+    if 'DB' in amount_str:
+        return -float(amount_str.replace('DB', ''))
+    try:
+        return float(amount_str)
+    except ValueError:
+        return 0.0
+
+
+def _count_value(count_str) -> int:
+    if not count_str or str(count_str).strip() in ('', '0'):
+        return 0
+    try:
+        return int(str(count_str).replace(',', ''))
+    except ValueError:
+        return 0
+
+
+def parse_amount(amount_str):
+    """Helper to parse amounts with commas and CR/DB flags"""
+    result = _amount_value(amount_str)
+    if trace_enabled():
+        trace_logger.debug("Parsing amount: %r -> %s", amount_str, result)
+    return result
+
+
+def parse_count(count_str):
+    """Helper to parse counts with commas"""
+    result = _count_value(count_str)
+    if trace_enabled():
+        trace_logger.debug("Parsing count: %r -> %s", count_str, result)
+    return result
+
+
+def _trace_line(index: int, groups: Tuple[str, ...], has_count: bool):
+    amounts = groups[1:] if has_count else groups
+    trace_logger.debug("%s: %r -> credit=%s debit=%s total=%s count=%s", ROW_LAYOUT[index][2], groups,
+                       _amount_value(amounts[0]), _amount_value(amounts[1]), _amount_value(amounts[2]),
+                       _count_value(groups[0]) if has_count else "-")
+
+
+def decode_fields(data: Dict) -> Dict:
+    """Turns the raw amount and count strings of an extracted report into numbers, in place"""
+    for key, value in data.items():
+        if key in HEADER_FIELDS:
+            continue
+        data[key] = _count_value(value) if key.endswith('_Count') else _amount_value(value)
+    return data
+
+
+# ========= SINGLE-PASS VISA REPORT PARSER =========
+def parse_visa_report(content: str) -> Dict:
+    """
+    Parses one VSS-110 report. The returned dict has the same keys (in the same
+    order) as the original regex-per-field parser, with numeric values.
+    """
+    return decode_fields(extract_visa_report(content).to_dict())
+
+
+def extract_visa_report(content: str) -> ParsedReport:
+    """
+    Extracts the fields of one VSS-110 report in a single pass over its lines.
+
+    Every line is visited once; literal substring checks gate the precompiled
+    patterns, so most lines never reach the regex engine. Amounts and counts are
+    left as the strings captured from the report (e.g. '4,845.52CR'): the batch
+    pipeline decodes a whole bundle's worth at once (columnar.decode_amounts).
+
+    Per-field log output is only produced while tracing is on (see logs.tracing).
+    """
+    trace = trace_enabled()
+    report = ParsedReport()
+    missing_headers = list(enumerate(HEADER_PATTERNS))
+
+    # Per-section state: opened/closed flags and the raw groups captured inside
+    opened = [False] * len(SECTIONS)
+    closed = [False] * len(SECTIONS)
+    line_groups: List[Dict[str, Tuple[str, ...]]] = [{} for _ in SECTIONS]
+    total_groups: List[Optional[Tuple[str, ...]]] = [None] * len(SECTIONS)
+
+    final_run: List[Tuple[str, ...]] = []
+    final_groups: Optional[List[Tuple[str, ...]]] = None
+    net_groups: Optional[Tuple[str, ...]] = None
+
+    for line in content.splitlines():
+        if missing_headers:
+            for header in list(missing_headers):
+                position, (_, marker, pattern) = header
+                if marker in line and (match := pattern.search(line)):
+                    report.headers[position] = match.group(1).strip()
+                    missing_headers.remove(header)
+
+        for idx, section in enumerate(SECTIONS):
+            if closed[idx]:
+                continue
+            segment = line
+            if not opened[idx]:
+                pos = line.find(section.start)
+                if pos < 0:
+                    continue
+                opened[idx] = True
+                segment = line[pos + len(section.start):]
+            end = segment.find(section.end)
+            if end >= 0:
+                closed[idx] = True
+                segment = segment[:end]
+            if 'TOTAL' not in segment:
+                continue
+            found = line_groups[idx]
+            for line_type, marker, pattern in section.line_patterns:
+                if line_type not in found and marker in segment:
+                    if match := pattern.search(segment):
+                        found[line_type] = match.groups()
+
+        for idx, section in enumerate(SECTIONS):
+            if total_groups[idx] is None and section.total_label in line:
+                if match := section.total_pattern.search(line):
+                    total_groups[idx] = match.groups()
+
+        if final_groups is None and line.strip():
+            if len(final_run) == 3 and line.lstrip().startswith(NET_SETTLEMENT_MARKER):
+                final_groups = final_run
+            else:
+                match = FINAL_TOTAL_PATTERN.match(line) if 'TOTAL' in line else None
+                if match and len(final_run) < 3 and match.group(1) == LINE_TYPES[len(final_run)]:
+                    final_run.append(match.groups()[1:])
+                elif match and match.group(1) == 'ACQUIRER':
+                    final_run = [match.groups()[1:]]
+                else:
+                    final_run = []
+
+        if net_groups is None and NET_SETTLEMENT_MARKER in line:
+            if match := NET_SETTLEMENT_PATTERN.search(line):
+                net_groups = match.groups()
+
+    # (ParsedReport position, captured groups, has count) of every line found
+    lines: List[Tuple[int, Tuple[str, ...], bool]] = []
+    key_totals = {}
+
+    for idx, section in enumerate(SECTIONS):
+        # A section only counts once both of its markers have been seen
+        if not closed[idx]:
+            continue
+        for line_type, index in zip(LINE_TYPES, section.line_indexes):
+            if groups := line_groups[idx].get(line_type):
+                lines.append((index, groups, section.has_count))
+        if total_groups[idx] is not None:
+            lines.append((section.total_index, total_groups[idx], section.has_count))
+            key_totals[section.name] = total_groups[idx][-1]
+
+    if final_groups is not None:
+        lines.extend((index, groups, False) for index, groups in zip(FINAL_TOTAL_INDEXES, final_groups))
+
+    if net_groups is not None:
+        lines.append((NET_SETTLEMENT_INDEX, net_groups, False))
+        key_totals['NetSettlement'] = net_groups[-1]
+
+    for index, groups, has_count in lines:
+        report.set_line(index, groups, has_count)
+        if trace:
+            _trace_line(index, groups, has_count)
+
+    if trace:
+        trace_logger.debug(
+            "Key totals for %s %s: interchange=%s reimbursement=%s visa_charges=%s net_settlement=%s",
+            report.header('ReportID', 'N/A'), report.header('ProcDate', 'N/A'),
+            key_totals.get('Interchange', 'N/A'), key_totals.get('Reimbursement', 'N/A'),
+            key_totals.get('VisaCharges', 'N/A'), key_totals.get('NetSettlement', 'N/A')
+        )
+
+    return report
@@ -0,0 +1,183 @@
+import operator
+import re
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.engine import Engine
+
+from .database import engine as default_engine
+from .models import DailySettlementRollup, VisaReportLine
+from .storage import ROLLUP_KEY, ROLLUP_SUMS, from_minor_units, parse_report_date, to_minor_units
+
+# Same operator set as the manual_test.py filters
+OPERATORS = {
+    "=": operator.eq,
+    "!=": operator.ne,
+    ">": operator.gt,
+    "<": operator.lt,
+    ">=": operator.ge,
+    "<=": operator.le,
+}
+
+FILTER_PATTERN = re.compile(r'^\s*(\w+)\s*(!=|>=|<=|=|>|<)\s*(.*?)\s*$')
+
+STRING_FIELDS = {'report_id', 'reporting_for', 'settlement_currency',
+                 'major_type', 'minor_type', 'crdb_label'}
+DATE_FIELDS = {'proc_date', 'report_date'}
+# Amounts are filtered and returned in currency units but stored in minor units
+AMOUNT_FIELDS = {'credit_amount': 'credit_minor', 'debit_amount': 'debit_minor', 'total_amount': 'total_minor'}
+
+MAX_PAGE_SIZE = 1000
+
+
+def parse_filter(expression: str) -> Tuple[str, str, object]:
+    """Turns 'total_amount>=100' into (column, operator, value) for visa_report_lines"""
+    match = FILTER_PATTERN.match(expression)
+    if not match:
+        raise HTTPException(status_code=400, detail=f"Invalid filter: {expression!r}")
+    field, op, raw_value = match.groups()
+
+    column = field
+    if field in AMOUNT_FIELDS or field == 'count':
+        try:
+            value = float(raw_value)
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Filter on {field} needs a number: {raw_value!r}")
+        if field in AMOUNT_FIELDS:
+            column, value = AMOUNT_FIELDS[field], to_minor_units(value)
+    elif field in DATE_FIELDS:
+        value = _parse_date(raw_value)
+        if value is None:
+            raise HTTPException(status_code=400, detail=f"Filter on {field} needs a date like 2025-05-16 or 16MAY25")
+    elif field in STRING_FIELDS:
+        value = raw_value
+    else:
+        raise HTTPException(status_code=400, detail=f"Unsupported filter field: {field}")
+
+    return column, op, value
+
+
+def seek_column(parsed: List[Tuple[str, str, object]]) -> Optional[str]:
+    """Column whose (column, id) index a query with these parsed filters seeks on"""
+    equal = [column for column, op, _ in parsed if op == "="]
+    ranges = [column for column, op, _ in parsed if op != "!="]
+    return (equal or ranges or [None])[0]
+
+
+def _parse_date(raw_value: str) -> Optional[date]:
+    try:
+        return date.fromisoformat(raw_value)
+    except ValueError:
+        return parse_report_date(raw_value)
+
+
+def line_response(row) -> dict:
+    """API shape of a stored line: minor units are turned back into amounts"""
+    item = dict(row)
+    for field, column in AMOUNT_FIELDS.items():
+        item[field] = from_minor_units(item.pop(column))
+    return item
+
+
+def query_report_lines(
+    filters: List[str],
+    after: Optional[int] = None,
+    limit: int = 100,
+    engine: Engine = default_engine,
+) -> dict:
+    """
+    One page of stored lines matching every filter.
+
+    Every filter column has a (column, id) index, so lines are ordered by the
+    column the query seeks on (the first = filter, else the first range filter,
+    else none) and then id: one index serves both the filter and the order.
+    Paging is keyset based: pass the returned `next_after` (the id of the last
+    line) as `after` to get the following page, which stays an index seek
+    however deep the page is.
+    """
+    table = VisaReportLine.__table__
+    parsed = [parse_filter(expression) for expression in filters]
+    conditions = [OPERATORS[op](table.c[column], value) for column, op, value in parsed]
+    seek = seek_column(parsed)
+    order = [table.c.id] if seek is None else [table.c[seek], table.c.id]
+    stmt = select(table).where(*conditions).order_by(*order).limit(limit)
+
+    with engine.connect() as conn:
+        if after is None:
+            rows = conn.execute(stmt).mappings().all()
+        elif seek is None:
+            rows = conn.execute(stmt.where(table.c.id > after)).mappings().all()
+        else:
+            column = table.c[seek]
+            after_value = conn.execute(select(column).where(table.c.id == after)).scalar()
+            if after_value is None:
+                raise HTTPException(status_code=400, detail="after must be the next_after of the previous page")
+            # The rest of the lines sharing the last line's value, then the lines above it: two
+            # seeks, where comparing (column, id) pairs would step through every line of that value
+            rows = conn.execute(stmt.where(column == after_value, table.c.id > after)).mappings().all()
+            if len(rows) < limit:
+                rows += conn.execute(stmt.where(column > after_value).limit(limit - len(rows))).mappings().all()
+        items = [line_response(row) for row in rows]
+
+    next_after = items[-1]["id"] if len(items) == limit else None
+    return {"items": items, "next_after": next_after}
+
+
+def query_settlement_summary(
+    period: str = "daily",
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    settlement_currency: Optional[str] = None,
+    major_type: Optional[str] = None,
+    minor_type: Optional[str] = None,
+    engine: Engine = default_engine,
+) -> dict:
+    """
+    Daily or monthly totals per currency/major_type/minor_type.
+
+    Reads daily_settlement_rollup only; monthly totals are summed from the
+    (few hundred) daily rows rather than from visa_report_lines.
+    """
+    if period not in ("daily", "monthly"):
+        raise HTTPException(status_code=400, detail="period must be 'daily' or 'monthly'")
+
+    rollup = DailySettlementRollup.__table__
+    conditions = []
+    if date_from is not None:
+        conditions.append(rollup.c.proc_date >= date_from)
+    if date_to is not None:
+        conditions.append(rollup.c.proc_date <= date_to)
+    for column, value in (('settlement_currency', settlement_currency),
+                          ('major_type', major_type), ('minor_type', minor_type)):
+        if value is not None:
+            conditions.append(rollup.c[column] == value)
+
+    stmt = select(rollup).where(*conditions).order_by(*(rollup.c[col] for col in ROLLUP_KEY))
+
+    totals: Dict[tuple, List[int]] = {}
+    with engine.connect() as conn:
+        for row in conn.execute(stmt).mappings():
+            day = row['proc_date']
+            bucket = day.isoformat() if period == "daily" else day.strftime("%Y-%m")
+            key = (bucket, row['settlement_currency'], row['major_type'], row['minor_type'])
+            sums = totals.setdefault(key, [0] * len(ROLLUP_SUMS))
+            for i, col in enumerate(ROLLUP_SUMS):
+                sums[i] += row[col]
+
+    items = []
+    for (bucket, currency, major, minor), sums in totals.items():
+        values = dict(zip(ROLLUP_SUMS, sums))
+        items.append({
+            "period": bucket,
+            "settlement_currency": currency,
+            "major_type": major,
+            "minor_type": minor,
+            "line_count": values['line_count'],
+            "count": values['count'],
+            "credit_amount": from_minor_units(values['credit_minor']),
+            "debit_amount": from_minor_units(values['debit_minor']),
+            "net_amount": from_minor_units(values['net_minor']),
+        })
+    return {"period": period, "items": items}
@@ -1,496 +1,531 @@
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException, BackgroundTasks
-from fastapi.responses import FileResponse
-import pandas as pd
-import os
-import tempfile
-import io
 import json
-import re
-import openpyxl
-from datetime import datetime
-from typing import Dict
-from fastapi.responses import JSONResponse
-from sqlalchemy.orm import Session
-from .database import SessionLocal
-from .models import VisaReportLine
-import sqlite3
-from fastapi.responses import StreamingResponse
-import mimetypes
-from fastapi import Depends
-from fastapi import Query
-from fastapi import Form
-from fastapi import Request
-from fastapi import Response
-from fastapi.exceptions import HTTPException
-import traceback
-from fastapi import Body
-from pydantic import BaseModel
-from pydantic import validator
-import re
+import logging
+import os
+import shutil
+from concurrent.futures import Executor, ThreadPoolExecutor
+from contextlib import ExitStack
+from datetime import date
+from itertools import chain
+from typing import TYPE_CHECKING, BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from fastapi import APIRouter, BackgroundTasks, File, Form, HTTPException, Query, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, StreamingResponse
+
+from .admission import check_upload_size, overloaded, processing_pool
+from .config import BATCH_FILE_WORKERS, MAX_ARCHIVE_MEMBERS, MAX_EXPANDED_BYTES, SERVER_TIMING
+from .exports import (
+    ARROW_STREAM_MEDIA_TYPE, CSV_MEDIA_TYPE, EXCEL_MEDIA_TYPE, PARQUET_MEDIA_TYPE, SQLITE_MEDIA_TYPE,
+    arrow_artifact, artifact_size, excel_artifact, iter_artifact, iter_csv, parquet_artifact, sqlite_artifact
+)
+from .ingest import ArchiveTooLarge, copy_upload, count_file_reports, iter_file_reports, split_reports, upload_sources
+from .jobs import DONE, Job, QueueFull, job_queue
+from .metrics import (
+    PARSE_FAILURES, RECONCILIATION_FAILURES, REPORTS_PARSED, ROWS_STORED, UPLOAD_BYTES, UPLOAD_REPORTS, UPLOADS,
+    StageTimer
+)
+from .parallel import get_parse_executor, parse_reports
+from .parser import ROWS_PER_REPORT
+from .queries import MAX_PAGE_SIZE, query_report_lines, query_settlement_summary
+from .storage import save_report_lines
+
+# pandas and the numpy-backed batch modules (columnar, validation) are imported
+# by the functions that build frames, so the app starts without loading them;
+# see app.warmup for loading them ahead of the first upload
+if TYPE_CHECKING:
+    import pandas as pd
 
 router = APIRouter()
+# Upload routes whose work runs on processing_pool; main.py admits them with AdmissionControl
+POOLED_PATHS = ("/process-visa-report", "/process-visa-report/batch")
+logger = logging.getLogger(__name__)
+
+
+def transform_report_data_to_rows(data: dict) -> "pd.DataFrame":
+    """Rows of a single parsed report, in the same columns as a whole processed bundle"""
+    from .columnar import ReportBatchBuilder
+
+    builder = ReportBatchBuilder()
+    builder.add(data)
+    return builder.to_frame()
+
+
+
+
+def iter_report_batches(
+    content: Union[str, Iterable[str]],
+    executor: Optional[Executor] = None,
+    batch_size: Optional[int] = None,
+    trace: Optional[bool] = None,
+    timer: Optional[StageTimer] = None,
+    progress: Optional[Callable[[int], None]] = None
+) -> Iterator["pd.DataFrame"]:
+    """
+    DataFrames of processed reports, `batch_size` reports at a time.
+
+    Without a batch size everything ends up in one (possibly empty) frame.
+    Every frame carries the Reconciliation column (see validation.reconcile).
+    Time spent parsing, adding rows and building frames is added to `timer`;
+    `progress` is called with the number of reports handled so far.
+    """
+    from .columnar import ReportBatchBuilder
+
+    timer = timer or StageTimer()
+
+    # Accept either a whole bundle or an already split stream of reports
+    reports = split_reports(content) if isinstance(content, str) else content
+    results = parse_reports(reports, executor, trace=trace)
+
+    # Rows of every report go into one columnar batch; a DataFrame is built per batch
+    builder = ReportBatchBuilder()
+
+    while True:
+        # Decoding and splitting the upload happen lazily inside this step too
+        with timer.stage("parse"):
+            result = next(results, None)
+        if result is None:
+            break
+        idx, parsed, error = result
+        if progress is not None:
+            progress(idx + 1)
+
+        if error is not None:
+            PARSE_FAILURES.inc()
+            logger.warning("Failed to process report #%d: %s", idx + 1, error)
+            continue
 
-
-# ========= VISA REPORT PARSING ROUTE =========
-def parse_visa_report(content: str) -> Dict:
-    """Parses Visa report and prints all values for verification"""
-    
-    def parse_amount(amount_str):
-        """Helper to parse amounts with commas and CR/DB flags"""
-        original = amount_str
-        if not amount_str or str(amount_str).strip() in ('', '0.00'):
-            return 0.0
-        amount_str = str(amount_str).replace(',', '').strip()
-        if 'CR' in amount_str:
-            result = float(amount_str.replace('CR', ''))
-        elif 'DB' in amount_str:
-            result = -float(amount_str.replace('DB', ''))
-        else:
-            try:
-                result = float(amount_str)
-            except ValueError:
-                result = 0.0
-        print(f"    🪙 Parsing amount: '{original}' → {result}")
-        return result
-
-    def parse_count(count_str):
-        """Helper to parse counts with commas"""
-        original = count_str
-        if not count_str or str(count_str).strip() in ('', '0'):
-            return 0
         try:
-            result = int(str(count_str).replace(',', ''))
-        except ValueError:
-            result = 0
-        print(f"    🔢 Parsing count: '{original}' → {result}")
-        return result
+            with timer.stage("rows"):
+                builder.add(parsed)
+        except Exception as e:
+            PARSE_FAILURES.inc()
+            logger.warning("Failed to process report #%d: %s", idx + 1, e)
+            continue
+        REPORTS_PARSED.inc()
 
-    # Initialize data dictionary
-    data = {}
+        if batch_size and len(builder) >= batch_size:
+            with timer.stage("frame"):
+                frame = builder.to_frame()
+            _count_reconciliation_failures(frame)
+            yield frame
+            builder = ReportBatchBuilder()
 
-    print("\n" + "="*40)
-    print("📋 STARTING REPORT PARSING 📋")
-    print("="*40 + "\n")
+    if len(builder) or not batch_size:
+        with timer.stage("frame"):
+            frame = builder.to_frame()
+        _count_reconciliation_failures(frame)
+        yield frame
 
-    # Header patterns
-    headers = {
-        'ReportID': r'REPORT ID:\s+(VSS-\d+)',
-        'ReportingFor': r'REPORTING FOR:\s+(.+?)\s+PROC',
-        'RollupTo': r'ROLLUP TO:\s+(.+?)\s+SETTLEMENT',
-        'FundsXferEntity': r'FUNDS XFER ENTITY:\s+(.+?)\n',
-        'ProcDate': r'PROC DATE:\s+(\d{2}[A-Za-z]{3}\d{2})',
-        'ReportDate': r'REPORT DATE:\s+(\d{2}[A-Za-z]{3}\d{2})',
-        'SettlementCurrency': r'SETTLEMENT CURRENCY:\s+([A-Z]{3})'
-    }
 
-    print("\n📌 PARSING HEADERS 📌")
-    for field, pattern in headers.items():
-        if match := re.search(pattern, content):
-            data[field] = match.group(1).strip()
-            print(f"  ✅ {field}: {data[field]}")
-        else:
-            print(f"  ❌ {field}: NOT FOUND")
-
-    # Define section patterns with explicit total patterns
-    sections = [
-        {
-            'name': 'Interchange',
-            'pattern': r'INTERCHANGE VALUE(.*?)REIMBURSEMENT FEES',
-            'line_types': ['ACQUIRER', 'ISSUER', 'OTHER'],
-            'has_count': True,
-            'total_pattern': r'TOTAL INTERCHANGE VALUE\s+([\d,]+)\s+([\d,]+\.\d{2}(?:CR|DB)?)\s+([\d,]+\.\d{2}(?:CR|DB)?)\s+([\d,]+\.\d{2}(?:CR|DB)?)',
-            'total_label': 'INTERCHANGE VALUE'
-        },
-        {
-            'name': 'Reimbursement',
-            'pattern': r'REIMBURSEMENT FEES(.*?)VISA CHARGES',
-            'line_types': ['ACQUIRER', 'ISSUER', 'OTHER'],
-            'has_count': False,
-            'total_pattern': r'TOTAL REIMBURSEMENT FEES\s+([\d,]+\.\d{2}(?:CR|DB)?)\s+([\d,]+\.\d{2}(?:CR|DB)?)\s+([\d,]+\.\d{2}(?:CR|DB)?)',
-            'total_label': 'REIMBURSEMENT FEES'
-        },
-        {
-            'name': 'VisaCharges',
-            'pattern': r'VISA CHARGES(.*?)TOTAL VISA CHARGES',
-            'line_types': ['ACQUIRER', 'ISSUER', 'OTHER'],
-            'has_count': False,
-            'total_pattern': r'TOTAL VISA CHARGES\s+([\d,]+\.\d{2}(?:CR|DB)?)\s+([\d,]+\.\d{2}(?:CR|DB)?)\s+([\d,]+\.\d{2}(?:CR|DB)?)',
-            'total_label': 'VISA CHARGES'
-        }
-    ]
-
-    # Dictionary to store the key totals we want to highlight
-    key_totals = {}
-
-    # Process each section
-    for section in sections:
-        print(f"\n🔍 PARSING {section['name'].upper()} SECTION 🔍")
-        if section_match := re.search(section['pattern'], content, re.DOTALL):
-            section_content = section_match.group(1)
-
-            for line_type in section['line_types']:
-                print(f"\n  📝 Processing {line_type} line:")
-                
-                # More flexible line pattern that handles variable whitespace
-                if section['has_count']:
-                    pattern = rf'TOTAL {line_type}\s+([\d,]+)\s+([\d,]+\.\d{{2}}(?:CR|DB)?)\s+([\d,]+\.\d{{2}}(?:CR|DB)?)\s+([\d,]+\.\d{{2}}(?:CR|DB)?)'
-                else:
-                    pattern = rf'TOTAL {line_type}\s+([\d,]+\.\d{{2}}(?:CR|DB)?)\s+([\d,]+\.\d{{2}}(?:CR|DB)?)\s+([\d,]+\.\d{{2}}(?:CR|DB)?)'
-
-                if match := re.search(pattern, section_content):
-                    groups = match.groups()
-                    print(f"    📊 Raw match groups: {groups}")
-
-                    if section['has_count']:
-                        count = parse_count(match.group(1))
-                        data[f"{section['name']}_{line_type}_Count"] = count
-                        credit = parse_amount(match.group(2))
-                        debit = parse_amount(match.group(3))
-                        total = parse_amount(match.group(4))
-                    else:
-                        credit = parse_amount(match.group(1))
-                        debit = parse_amount(match.group(2))
-                        total = parse_amount(match.group(3))
-
-                    data[f"{section['name']}_{line_type}_CreditAmount"] = credit
-                    data[f"{section['name']}_{line_type}_DebitAmount"] = debit
-                    data[f"{section['name']}_{line_type}_TotalAmount"] = total
-
-                    print(f"    💾 Stored values:")
-                    if section['has_count']:
-                        print(f"      🔢 Count: {count}")
-                    print(f"      💰 Credit: {credit}")
-                    print(f"      💸 Debit: {debit}")
-                    print(f"      🏦 Total: {total}")
-                else:
-                    print(f"    ⚠️ No match found for {line_type}")
-
-            # Parse section total using the specific pattern
-            print(f"\n  🏷️ Processing {section['name']} TOTAL:")
-            if 'total_pattern' in section:
-                total_pattern = section['total_pattern']
-                print(f"    Using specific pattern: {total_pattern}")
-                
-                if total_match := re.search(total_pattern, content):
-                    groups = total_match.groups()
-                    print(f"    📊 Raw total match groups: {groups}")
-
-                    if section['has_count']:
-                        total_count = parse_count(total_match.group(1))
-                        data[f"{section['name']}_Total_Count"] = total_count
-                        total_credit = parse_amount(total_match.group(2))
-                        total_debit = parse_amount(total_match.group(3))
-                        total_total = parse_amount(total_match.group(4))
-                    else:
-                        total_credit = parse_amount(total_match.group(1))
-                        total_debit = parse_amount(total_match.group(2))
-                        total_total = parse_amount(total_match.group(3))
-
-                    data[f"{section['name']}_Total_CreditAmount"] = total_credit
-                    data[f"{section['name']}_Total_DebitAmount"] = total_debit
-                    data[f"{section['name']}_Total_TotalAmount"] = total_total
-
-                    # Store the total for this section in our key_totals dictionary
-                    key_totals[section['name']] = total_total
-
-                    print(f"    💾 Stored total values:")
-                    if section['has_count']:
-                        print(f"      🔢 Total Count: {total_count}")
-                    print(f"      💰 Total Credit: {total_credit}")
-                    print(f"      💸 Total Debit: {total_debit}")
-                    print(f"      🏦 Total Total: {total_total}")
-                else:
-                    print(f"    ⚠️ No total match found using specific pattern for {section['name']}")
-            else:
-                print(f"    ⚠️ No total pattern defined for {section['name']}")
-
-        # Parse the "TOTAL" section that appears right before NET SETTLEMENT
-        # Parse the "TOTAL" section that appears right before NET SETTLEMENT
-        # In the FinalTotals parsing section, replace with this:
-
-        print("\n" + "="*40)
-        print("💳 PARSING FINAL TOTALS SECTION 💳")
-        print("="*40 + "\n")
-
-            # Replace the totals_pattern with this more precise version:
-    totals_pattern = (
-        r'^\s*TOTAL\s+ACQUIRER\s+([\d,]+\.\d{2}[A-Z]*)\s+([\d,]+\.\d{2}[A-Z]*)\s+([\d,]+\.\d{2}[A-Z]*)\s*$\n'
-        r'^\s*TOTAL\s+ISSUER\s+([\d,]+\.\d{2}[A-Z]*)\s+([\d,]+\.\d{2}[A-Z]*)\s+([\d,]+\.\d{2}[A-Z]*)\s*$\n'
-        r'^\s*TOTAL\s+OTHER\s+([\d,]+\.\d{2}[A-Z]*)\s+([\d,]+\.\d{2}[A-Z]*)\s+([\d,]+\.\d{2}[A-Z]*)\s*$\n'
-        r'(?=\s*NET SETTLEMENT AMOUNT)'
-    )
+def _count_reconciliation_failures(frame: "pd.DataFrame"):
+    from .validation import RECONCILIATION_COLUMN
 
-    # And modify the search to work line-by-line
-    if totals_match := re.search(totals_pattern, content, re.DOTALL | re.MULTILINE):
-        print("Found FINAL TOTALS section")
-        
-        # Parse all values immediately (no delayed parsing)
-        for line_type, groups in [('ACQUIRER', (1, 2, 3)), 
-                                ('ISSUER', (4, 5, 6)),
-                                ('OTHER', (7, 8, 9))]:
-            print(f"\n  📝 Processing {line_type} line:")
-            
-            credit = parse_amount(totals_match.group(groups[0]))
-            debit = parse_amount(totals_match.group(groups[1]))
-            total = parse_amount(totals_match.group(groups[2]))
-            
-            data[f"FinalTotal_{line_type}_CreditAmount"] = credit
-            data[f"FinalTotal_{line_type}_DebitAmount"] = debit
-            data[f"FinalTotal_{line_type}_TotalAmount"] = total
-            
-            print(f"    📊 Raw values: {totals_match.group(groups[0])}, {totals_match.group(groups[1])}, {totals_match.group(groups[2])}")
-            print(f"    💾 Stored values: {credit}, {debit}, {total}")
-
-
-    # Parse net settlement with more flexible pattern
-    print("\n" + "="*40)
-    print("💵 PARSING NET SETTLEMENT 💵")
-    print("="*40 + "\n")
-    net_pattern = r'NET SETTLEMENT AMOUNT\s+([\d,]+\.\d{2}(?:CR|DB)?)\s+([\d,]+\.\d{2}(?:CR|DB)?)\s+([\d,]+\.\d{2}(?:CR|DB)?)'
-    if net_match := re.search(net_pattern, content):
-        groups = net_match.groups()
-        print(f"  📊 Raw match groups: {groups}")
-        
-        credit = parse_amount(net_match.group(1))
-        debit = parse_amount(net_match.group(2))
-        total = parse_amount(net_match.group(3))
-
-        data['Settlement_Net_CreditAmount'] = credit
-        data['Settlement_Net_DebitAmount'] = debit
-        data['Settlement_Net_TotalAmount'] = total
-
-        # Store the net settlement amount in our key_totals dictionary
-        key_totals['NetSettlement'] = total
-
-        print(f"  💾 Stored values:")
-        print(f"    💰 Credit: {credit}")
-        print(f"    💸 Debit: {debit}")
-        print(f"    🏦 Total: {total}")
-    else:
-        print("  ⚠️ No match found for NET SETTLEMENT AMOUNT")
+    failed = int((frame[RECONCILIATION_COLUMN].to_numpy()[::ROWS_PER_REPORT] != '').sum())
+    if failed:
+        RECONCILIATION_FAILURES.inc(failed)
+        logger.warning("%d report(s) don't add up to their totals (see the %s column)", failed, RECONCILIATION_COLUMN)
 
-    # Print the key totals in a prominent way
-    print("\n" + "="*40)
-    print("💰 KEY TOTALS 💰")
-    print("="*40)
-    print(f"🔄 Interchange Total: {key_totals.get('Interchange', 'N/A')}")
-    print(f"💳 Reimbursement Total: {key_totals.get('Reimbursement', 'N/A')}")
-    print(f"💲 Visa Charges Total: {key_totals.get('VisaCharges', 'N/A')}")
-    print(f"🏦 Net Settlement Amount: {key_totals.get('NetSettlement', 'N/A')}")
-    print("="*40 + "\n")
 
-    print("\n" + "="*40)
-    print("🎉 FINAL PARSED DATA 🎉")
-    print("="*40 + "\n")
-    for key, value in data.items():
-        print(f"🔑 {key}: {value}")
+def process_multiple_visa_reports(
+    content: Union[str, Iterable[str]],
+    executor: Optional[Executor] = None,
+    trace: Optional[bool] = None,
+    timer: Optional[StageTimer] = None,
+    progress: Optional[Callable[[int], None]] = None
+) -> "pd.DataFrame":
+    return next(iter_report_batches(content, executor, trace=trace, timer=timer, progress=progress))
 
-    return data
 
 
+def report_file_stem(df: "pd.DataFrame") -> Tuple[str, str, str]:
+    """report_id, proc_date and report_date used in output filenames"""
+    if len(df) > 1:
+        second_row = df.iloc[1]
+        report_id = str(second_row.get('ReportID', 'VSS-000')).replace("/", "-")
+        proc_date = str(second_row.get('ProcDate', 'nodate')).replace("/", "-")
+        report_date = str(second_row.get('ReportDate', 'nodate')).replace("/", "-")
+    else:
+        report_id = "VSS-000"
+        proc_date = "nodate"
+        report_date = "nodate"
+    return report_id, proc_date, report_date
 
 
-def transform_report_data_to_rows(data: dict) -> pd.DataFrame:
-    # First split ReportingFor into ReportingFor and TransactionType
-    reporting_for_full = data.get("ReportingFor", "")
-    split_parts = re.split(r'\s{2,}', reporting_for_full.strip())  # split on 2+ spaces
+def _empty_frame() -> "pd.DataFrame":
+    """Processed frame of an upload without reports: no rows, the usual columns"""
+    from .columnar import ReportBatchBuilder
 
-    if len(split_parts) == 2:
-        data["ReportingFor"] = split_parts[0]
-        data["TransactionType"] = split_parts[1]
-    else:
-        data["ReportingFor"] = reporting_for_full
-        data["TransactionType"] = ""
-
-    metadata_cols = ['ReportID', 'ReportingFor', 'TransactionType', 'RollupTo', 'FundsXferEntity', 
-                     'ProcDate', 'ReportDate', 'SettlementCurrency']
-
-    sections = [
-        {
-            'MajorType': 'Interchange',
-            'MinorTypes': ['ACQUIRER', 'ISSUER', 'OTHER', 'Total'],
-            'Fields': ['Count', 'CreditAmount', 'DebitAmount', 'TotalAmount']
-        },
-        {
-            'MajorType': 'Reimbursement',
-            'MinorTypes': ['ACQUIRER', 'ISSUER', 'OTHER', 'Total'],
-            'Fields': ['CreditAmount', 'DebitAmount', 'TotalAmount']
-        },
-        {
-            'MajorType': 'VisaCharges',
-            'MinorTypes': ['ACQUIRER', 'ISSUER', 'OTHER', 'Total'],
-            'Fields': ['CreditAmount', 'DebitAmount', 'TotalAmount']
-        },
-        {
-            'MajorType': 'FinalTotal',
-            'MinorTypes': ['ACQUIRER', 'ISSUER', 'OTHER'],
-            'Fields': ['CreditAmount', 'DebitAmount', 'TotalAmount'],
-            'HasCount': False  # Add this flag
-        },
-        {
-            'MajorType': 'Settlement',
-            'MinorTypes': ['Net'],
-            'Fields': ['CreditAmount', 'DebitAmount', 'TotalAmount']
-        }
-    ]
-
-    rows = []
-
-    for section in sections:
-        for minor_type in section['MinorTypes']:
-            row = {col: data.get(col, '') for col in metadata_cols}
-            row['MajorType'] = section['MajorType']
-            row['MinorType'] = "Net Settlement Amount" if minor_type == 'Net' else minor_type
-
-            for field in section['Fields']:
-                if minor_type == 'Net':
-                    key = f"Settlement_Net_{field}"
-                elif section['MajorType'] == 'FinalTotal':
-                    for field in section['Fields']:
-                        key = f"FinalTotal_{minor_type}_{field}"
-                        # Use direct value if exists, otherwise 0
-                        row[field] = data.get(key, 0.0 if 'Amount' in field else 0)
-                    
-                    # Special case: Ensure ISSUER shows the correct values
-                    if minor_type == 'ISSUER':
-                        row['CreditAmount'] = data.get('FinalTotal_ISSUER_CreditAmount', 0)
-                        row['DebitAmount'] = data.get('FinalTotal_ISSUER_DebitAmount', 0)
-                        row['TotalAmount'] = data.get('FinalTotal_ISSUER_TotalAmount', 0)
-                elif minor_type == 'Total':
-                    key = f"{section['MajorType']}_Total_{field}"
-                else:
-                    key = f"{section['MajorType']}_{minor_type}_{field}"
-
-                value = data.get(key)
-                if value is None:
-                    row[field] = 0.0 if 'Amount' in field else 0
-                elif isinstance(value, (int, float)):
-                    row[field] = value
-                else:
-                    try:
-                        row[field] = float(value) if 'Amount' in field else int(value)
-                    except (ValueError, TypeError):
-                        row[field] = 0.0 if 'Amount' in field else 0
-
-            rows.append(row)
-
-    df = pd.DataFrame(rows)
-    df['TotalType'] = df['TotalAmount'].apply(lambda x: 'CR' if x >= 0 else 'DB')
-    df['TotalAmount'] = df['TotalAmount'].abs()
-
-    column_order = metadata_cols + ['MajorType', 'MinorType', 'Count', 
-                                    'CreditAmount', 'DebitAmount', 'TotalAmount', 'TotalType']
-
-    return df[column_order]
-
-
-
-
-def process_multiple_visa_reports(content: str) -> pd.DataFrame:
-    # Split content into multiple reports
-    reports = content.strip().split("*** END OF VSS-110 REPORT ***")
-
-    final_rows = []
-
-    for idx, report_text in enumerate(reports):
-        report_text = report_text.strip()
-        if not report_text:
-            continue
+    return ReportBatchBuilder().to_frame()
 
-        print(f"\n📄 Processing Report #{idx+1}...")
 
-        try:
-            parsed = parse_visa_report(report_text)
-            df = transform_report_data_to_rows(parsed)
-            final_rows.append(df)
-        except Exception as e:
-            print(f"⚠️ Failed to process report #{idx+1}: {e}")
+# output form value -> (artifact builder, media type, file extension)
+OUTPUT_FORMATS = {
+    "excel": (excel_artifact, EXCEL_MEDIA_TYPE, "xlsx"),
+    "database": (sqlite_artifact, SQLITE_MEDIA_TYPE, "db"),
+    "parquet": (parquet_artifact, PARQUET_MEDIA_TYPE, "parquet"),
+    "arrow": (arrow_artifact, ARROW_STREAM_MEDIA_TYPE, "arrows"),
+}
 
-    combined_df = pd.concat(final_rows, ignore_index=True)
-    return combined_df
+# Reports per streamed CSV batch
+CSV_BATCH_REPORTS = 500
 
 
+def output_format(output: str) -> str:
+    """Normalised output form value; anything unknown falls back to excel"""
+    return output if output == "csv" or output in OUTPUT_FORMATS else "excel"
 
-def autosize_excel_columns(filename):
-    wb = openpyxl.load_workbook(filename)
-    ws = wb.active
 
-    for column_cells in ws.columns:
-        max_length = 0
-        col_letter = openpyxl.utils.get_column_letter(column_cells[0].column)
-        for cell in column_cells:
-            if cell.value:
-                cell_len = len(str(cell.value))
-                if cell_len > max_length:
-                    max_length = cell_len
-        adjusted_width = (max_length + 2)
-        ws.column_dimensions[col_letter].width = adjusted_width
+def build_artifact(df: "pd.DataFrame", output: str, stem: Optional[str] = None) -> Tuple[BinaryIO, str, str]:
+    """
+    (artifact, media type, download filename) of a processed bundle in a
+    non-streamed format. `stem` replaces the name derived from the report.
+    """
+    report_id, proc_date, report_date = report_file_stem(df)
+    build, media_type, extension = OUTPUT_FORMATS[output]
+    artifact = build(df)
+    if stem is not None:
+        filename = f"{stem}.{extension}"
+    elif extension == "db":
+        filename = f"{report_id}.db"
+    else:
+        filename = f"{report_id}.{proc_date}.{report_date}.{extension}"
+    return artifact, media_type, filename
 
-    wb.save(filename)
 
+# Response headers with the number of reports failing the reconciliation checks, and
+# the validation.reconciliation_summary that GET /jobs/{id} reports, as JSON. A streamed
+# CSV response goes out before its reports are checked, so it carries neither.
+RECONCILIATION_HEADER = "X-Reconciliation-Failed-Reports"
+RECONCILIATION_SUMMARY_HEADER = "X-Reconciliation-Summary"
 
 
+def _reconciliation_headers(df: "pd.DataFrame") -> Dict[str, str]:
+    from .validation import reconciliation_summary
 
+    summary = reconciliation_summary(df)
+    return {
+        RECONCILIATION_HEADER: str(summary["reports_failed"]),
+        # ASCII-only JSON, as header values must be
+        RECONCILIATION_SUMMARY_HEADER: json.dumps(summary, separators=(",", ":")),
+    }
+
+
+def _artifact_response(artifact: BinaryIO, media_type: str, filename: str, timer: StageTimer,
+                       background_tasks: BackgroundTasks, df: "pd.DataFrame") -> StreamingResponse:
+    headers = {
+        "Content-Disposition": f'attachment; filename="{filename}"',
+        "Content-Length": str(artifact_size(artifact)),
+        **_reconciliation_headers(df),
+    }
+    if SERVER_TIMING:
+        headers["Server-Timing"] = timer.server_timing()
+
+    # Release the buffer once the response is sent, even if streaming never started
+    background_tasks.add_task(artifact.close)
+    return StreamingResponse(
+        iter_artifact(artifact),
+        media_type=media_type,
+        headers=headers
+    )
 
-def save_df_to_sqlite(df, db_path="parsed_report.db", table_name="visa_report"):
-    if os.path.exists(db_path):
-        os.remove(db_path)
-    conn = sqlite3.connect(db_path)
-    df.to_sql(table_name, conn, if_exists="replace", index=False)
-    conn.close()
-    return db_path
 
+def _record_upload(size: Optional[int], output: str, rows: int, timer: StageTimer):
+    if size is not None:
+        UPLOAD_BYTES.observe(size)
+    UPLOAD_REPORTS.observe(rows // ROWS_PER_REPORT)
+    UPLOADS.inc(output=output)
+    timer.observe()
 
 
+def _stream_csv_batches(upload, first: "pd.DataFrame", rest: Iterator["pd.DataFrame"],
+                        timer: StageTimer, on_done) -> Iterator["pd.DataFrame"]:
+    rows = 0
+    try:
+        for frame in chain([first], rest):
+            # Stored batch by batch, as the rows go out
+            with timer.stage("store"):
+                ROWS_STORED.inc(save_report_lines(frame))
+            rows += len(frame)
+            yield frame
+    finally:
+        upload.close()
+        on_done(rows)
+
 
 @router.post("/process-visa-report")
 async def process_visa_report(
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
-    output: str = Form("excel")
+    output: str = Form("excel"),
+    trace: bool = Form(False, description="Log every parsed field of this upload")
 ):
-    contents = await file.read()
-    content_str = contents.decode("utf-8")
-    df = process_multiple_visa_reports(content_str)
+    check_upload_size(file.size)
+    timer = StageTimer()
+    output = output_format(output)
+
+    # Every blocking stage runs on the bounded processing pool; AdmissionControl
+    # took this request's slot before the upload was read and holds it until the
+    # response (streamed or not) is done
+
+    # CSV is streamed while the bundle is still being parsed
+    if output == "csv":
+        # Parsing continues after this handler returns, so it reads from its own copy of the upload
+        with timer.stage("spool"):
+            upload = await processing_pool.run(copy_upload, file.file)
+        background_tasks.add_task(upload.close)
+        batches = iter_report_batches(
+            iter_file_reports(upload), get_parse_executor(), CSV_BATCH_REPORTS, trace, timer
+        )
+        first = await processing_pool.run(next, batches, None)
+        if first is None:
+            first = _empty_frame()
+        report_id, proc_date, report_date = report_file_stem(first)
+        csv_filename = f"{report_id}.{proc_date}.{report_date}.csv"
+        headers = {"Content-Disposition": f'attachment; filename="{csv_filename}"'}
+        # Only the work done before the first byte goes out is known at this point
+        if SERVER_TIMING:
+            headers["Server-Timing"] = timer.server_timing()
+
+        def on_done(rows: int):
+            _record_upload(file.size, "csv", rows, timer)
+
+        return StreamingResponse(
+            iter_csv(_stream_csv_batches(upload, first, batches, timer, on_done)),
+            media_type=CSV_MEDIA_TYPE,
+            headers=headers
+        )
 
-    # Extract report_id for use in filenames
-    if len(df) > 1:
-        second_row = df.iloc[1]
-        report_id = str(second_row.get('ReportID', 'VSS-000')).replace("/", "-")
-        proc_date = str(second_row.get('ProcDate', 'nodate')).replace("/", "-")
-        report_date = str(second_row.get('ReportDate', 'nodate')).replace("/", "-")
-    else:
-        report_id = "VSS-000"
-        proc_date = "nodate"
-        report_date = "nodate"
+    # Stream the spooled upload one report at a time instead of decoding it whole.
+    # Parsing runs on a pool thread (fanned out to the process pool if one is
+    # configured) so the event loop only awaits the result.
+    df = await processing_pool.run(
+        process_multiple_visa_reports,
+        iter_file_reports(file.file),
+        get_parse_executor(),
+        trace,
+        timer
+    )
 
-    # Database mode
-    if output == "database":
-        db_path = save_df_to_sqlite(df)
-        db_filename = f"{report_id}.db"
-        return FileResponse(
-            db_path,
-            media_type="application/octet-stream",
-            filename=db_filename,
-            headers={
-                "Content-Disposition": f'attachment; filename="{db_filename}"'
-            }
-        )
+    # Keep the history of every processed report in visa_report_lines
+    with timer.stage("store"):
+        ROWS_STORED.inc(await processing_pool.run(save_report_lines, df))
 
-    # Excel mode
-    excel_filename = f"{report_id}.{proc_date}.{report_date}.xlsx"
+    # Each request builds its artifact in its own spooled buffer
+    with timer.stage("export"):
+        artifact, media_type, filename = await processing_pool.run(build_artifact, df, output)
 
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".xlsx") as tmp:
-        output_path = tmp.name
-        df.to_excel(output_path, index=False)
-        autosize_excel_columns(output_path)
+    _record_upload(file.size, output, len(df), timer)
+    return _artifact_response(artifact, media_type, filename, timer, background_tasks, df)
 
-    file_stream = open(output_path, "rb")
-    return StreamingResponse(
-        file_stream,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={
-            "Content-Disposition": f'attachment; filename="{excel_filename}"'
+
+# Added to batch outputs: which uploaded file (or zip member) each row came from
+SOURCE_FILE_COLUMN = "SourceFile"
+
+
+def process_sources(
+    sources: List[Tuple[str, Callable[[], BinaryIO]]],
+    executor: Optional[Executor] = None,
+    trace: Optional[bool] = None,
+    workers: int = BATCH_FILE_WORKERS
+) -> "pd.DataFrame":
+    """
+    Processes several files at once, each through process_multiple_visa_reports.
+
+    Files run on their own threads; their reports all go to the shared parser
+    pool when there is one, so the pool is kept busy across files. The result
+    has the rows of every file, in upload order, plus a SourceFile column.
+    """
+    import pandas as pd
+
+    def process(source: Tuple[str, Callable[[], BinaryIO]]) -> "pd.DataFrame":
+        name, open_source = source
+        with open_source() as fileobj:
+            try:
+                df = process_multiple_visa_reports(iter_file_reports(fileobj), executor, trace)
+            except UnicodeDecodeError as e:
+                raise HTTPException(status_code=400, detail=f"{name} is not a text report: {e.reason}")
+        df[SOURCE_FILE_COLUMN] = name
+        return df
+
+    frames = []
+    if sources:
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(sources)))) as pool:
+            frames = [df for df in pool.map(process, sources) if len(df)]
+    if not frames:
+        df = _empty_frame()
+        df[SOURCE_FILE_COLUMN] = pd.Series(dtype=object)
+        return df
+    return pd.concat(frames, ignore_index=True)
+
+
+@router.post("/process-visa-report/batch")
+async def process_visa_report_batch(
+    background_tasks: BackgroundTasks,
+    files: List[UploadFile] = File(..., description="Report files and/or zip archives of them"),
+    output: str = Form("excel"),
+    trace: bool = Form(False, description="Log every parsed field of this upload")
+):
+    """Processes many files (or zips of them) in one request into one combined output"""
+    check_upload_size(sum(upload.size or 0 for upload in files))
+    timer = StageTimer()
+    output = output_format(output)
+
+    def process_all() -> Tuple["pd.DataFrame", int]:
+        with ExitStack() as stack:
+            sources = [
+                source
+                for upload in files
+                for source in stack.enter_context(upload_sources(
+                    upload.filename or "upload", upload.file, MAX_ARCHIVE_MEMBERS, MAX_EXPANDED_BYTES
+                ))
+            ]
+            return process_sources(sources, get_parse_executor(), trace), len(sources)
+
+    with timer.stage("parse"):
+        try:
+            df, n_sources = await processing_pool.run(process_all)
+        except ArchiveTooLarge as e:
+            raise HTTPException(status_code=413, detail=str(e))
+
+    with timer.stage("store"):
+        ROWS_STORED.inc(await processing_pool.run(save_report_lines, df))
+
+    report_id, _, _ = report_file_stem(df)
+    stem = f"{report_id}.batch-{n_sources}-files"
+    _record_upload(sum(upload.size or 0 for upload in files), output, len(df), timer)
+
+    if output == "csv":
+        headers = {
+            "Content-Disposition": f'attachment; filename="{stem}.csv"',
+            **_reconciliation_headers(df),
         }
-    )
+        if SERVER_TIMING:
+            headers["Server-Timing"] = timer.server_timing()
+        return StreamingResponse(iter_csv([df]), media_type=CSV_MEDIA_TYPE, headers=headers)
+
+    with timer.stage("export"):
+        artifact, media_type, filename = await processing_pool.run(build_artifact, df, output, stem)
+    return _artifact_response(artifact, media_type, filename, timer, background_tasks, df)
+
+
+def _run_job(job: Job, trace: bool):
+    """The /process-visa-report pipeline for a spooled job upload, writing its result to the job directory"""
+    from .validation import ReconciliationTally, reconciliation_summary
+
+    timer = StageTimer()
+    size = os.path.getsize(job.upload_path)
+
+    def progress(parsed: int):
+        job.update(reports_parsed=parsed)
+
+    with open(job.upload_path, "rb") as upload:
+        with timer.stage("count"):
+            job.update(reports_total=count_file_reports(upload))
+
+        if job.output == "csv":
+            batches = iter_report_batches(
+                iter_file_reports(upload), get_parse_executor(), CSV_BATCH_REPORTS, trace, timer, progress
+            )
+            first = next(batches, None)
+            if first is None:
+                first = _empty_frame()
+            report_id, proc_date, report_date = report_file_stem(first)
+            # Recorded before writing, so a partial file of a failed job is removed with the job
+            result_path = job_queue.path(job.id, "csv")
+            job.update(result_path=result_path)
+            tally = ReconciliationTally()
+            with open(result_path, "wb") as target:
+                for chunk in iter_csv(tally.track(_stream_csv_batches(
+                    upload, first, batches, timer, lambda rows: _record_upload(size, "csv", rows, timer)
+                ))):
+                    target.write(chunk)
+            job.update(result_filename=f"{report_id}.{proc_date}.{report_date}.csv",
+                       media_type=CSV_MEDIA_TYPE, reconciliation=tally.summary())
+            return
+
+        df = process_multiple_visa_reports(
+            iter_file_reports(upload), get_parse_executor(), trace, timer, progress
+        )
+
+    with timer.stage("store"):
+        ROWS_STORED.inc(save_report_lines(df))
+    with timer.stage("export"):
+        artifact, media_type, filename = build_artifact(df, job.output)
+        result_path = job_queue.path(job.id, filename.rsplit(".", 1)[-1])
+        # Recorded before writing, like the CSV result above
+        job.update(result_path=result_path)
+        with artifact, open(result_path, "wb") as target:
+            artifact.seek(0)
+            shutil.copyfileobj(artifact, target)
+    _record_upload(size, job.output, len(df), timer)
+    job.update(result_filename=filename, media_type=media_type, reconciliation=reconciliation_summary(df))
+
+
+def _job_response(job: Job) -> Dict:
+    status = job.snapshot()
+    status["status_url"] = f"/jobs/{job.id}"
+    status["result_url"] = f"/jobs/{job.id}/result"
+    return status
+
+
+@router.post("/jobs", status_code=202)
+async def create_job(
+    file: UploadFile = File(...),
+    output: str = Form("excel"),
+    trace: bool = Form(False, description="Log every parsed field of this upload")
+):
+    """Queues an upload for background processing; poll the status URL, then fetch the result"""
+    check_upload_size(file.size)
+    # Checked before spooling so a full queue costs nothing; submit checks again
+    if job_queue.full():
+        raise overloaded(503, "The job queue is full, try again later")
+    job_id = await run_in_threadpool(job_queue.spool, file.file)
+    try:
+        job = job_queue.submit(job_id, file.filename, output_format(output), lambda job: _run_job(job, trace))
+    except QueueFull:
+        raise overloaded(503, "The job queue is full, try again later")
+    return _job_response(job)
+
+
+def _find_job(job_id: str) -> Job:
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job")
+    return job
+
+
+@router.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    return _job_response(_find_job(job_id))
+
+
+@router.get("/jobs/{job_id}/result")
+def get_job_result(job_id: str):
+    job = _find_job(job_id)
+    status = job.snapshot()
+    if status["status"] != DONE:
+        raise HTTPException(status_code=409, detail=status["error"] or f"Job is {status['status']}")
+    return FileResponse(job.result_path, media_type=job.media_type, filename=job.result_filename)
+
+
+@router.get("/reports/lines")
+def get_report_lines(
+    filters: List[str] = Query([], alias="filter", description="Conditions like 'total_amount>=100', combined with AND"),
+    after: Optional[int] = Query(None, description="next_after from the previous page"),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE)
+):
+    return query_report_lines(filters, after=after, limit=limit)
 
 
+@router.get("/reports/summary")
+def get_report_summary(
+    period: str = Query("daily", description="'daily' or 'monthly'"),
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    settlement_currency: Optional[str] = None,
+    major_type: Optional[str] = None,
+    minor_type: Optional[str] = None
+):
+    return query_settlement_summary(
+        period, date_from, date_to, settlement_currency, major_type, minor_type
+    )
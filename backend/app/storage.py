@@ -0,0 +1,261 @@
+import logging
+from datetime import date, datetime
+from collections import defaultdict
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, case, func, or_, select, tuple_
+from sqlalchemy.engine import Connection, Engine
+
+from .database import engine as default_engine
+from .models import DailySettlementRollup, VisaReportLine
+
+# The query routes use this module too; numpy and pandas only load once rows are stored
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Report dates look like 16MAY25
+REPORT_DATE_FORMAT = "%d%b%y"
+
+# DataFrame column -> visa_report_lines column
+LINE_COLUMNS = {
+    'ReportID': 'report_id',
+    'ReportingFor': 'reporting_for',
+    'TransactionType': 'transaction_type',
+    'RollupTo': 'rollup_to',
+    'FundsXferEntity': 'funds_xfer_entity',
+    'SettlementCurrency': 'settlement_currency',
+    'ProcDate': 'proc_date',
+    'ReportDate': 'report_date',
+    'MajorType': 'major_type',
+    'MinorType': 'minor_type',
+    'Count': 'count',
+    'CreditAmount': 'credit_minor',
+    'DebitAmount': 'debit_minor',
+    'TotalAmount': 'total_minor',
+    'TotalType': 'crdb_label',
+}
+DATE_COLUMNS = ['proc_date', 'report_date']
+MINOR_UNIT_COLUMNS = ['credit_minor', 'debit_minor', 'total_minor']
+
+# A report is identified by its header (report_date aside, so a re-run replaces it);
+# its lines by major_type/minor_type on top
+REPORT_KEY = ['report_id', 'reporting_for', 'settlement_currency', 'proc_date',
+              'transaction_type', 'rollup_to', 'funds_xfer_entity']
+# Key columns added by schema revision 6: rows stored before it are NULL there
+# and are matched on the rest of the key
+LATER_KEY_COLUMNS = ['transaction_type', 'rollup_to', 'funds_xfer_entity']
+LINE_KEY = REPORT_KEY + ['major_type', 'minor_type']
+
+# daily_settlement_rollup key and the sums kept for it
+ROLLUP_KEY = ['proc_date', 'settlement_currency', 'major_type', 'minor_type']
+ROLLUP_SUMS = ['line_count', 'count', 'credit_minor', 'debit_minor', 'net_minor']
+# visa_report_lines columns a line's share of the rollup is computed from
+ROLLUP_RECORD_COLUMNS = ROLLUP_KEY + ['count', 'credit_minor', 'debit_minor', 'total_minor', 'crdb_label']
+# Report keys per IN (...) lookup, well under SQLite's bound parameter limit
+KEY_BATCH_SIZE = 200
+
+
+def parse_report_date(value) -> Optional[date]:
+    """16MAY25 -> date(2025, 5, 16); None when the value is missing or malformed"""
+    if isinstance(value, date):
+        return value
+    try:
+        return datetime.strptime(str(value).strip(), REPORT_DATE_FORMAT).date()
+    except ValueError:
+        return None
+
+
+def to_minor_units(amount) -> Optional[int]:
+    """Amount in currency units -> integer minor units (cents)"""
+    if amount is None or amount != amount:
+        return None
+    return int(round(float(amount) * 100))
+
+
+def from_minor_units(minor: Optional[int]) -> Optional[float]:
+    return None if minor is None else minor / 100
+
+
+def _parse_dates(column: "pd.Series") -> "np.ndarray":
+    """parse_report_date over a column, called once per distinct value rather than per row"""
+    import numpy as np
+    import pandas as pd
+
+    codes, uniques = pd.factorize(column)
+    # factorize codes missing values as -1, which picks the trailing None
+    parsed = np.array([parse_report_date(value) for value in uniques] + [None], dtype=object)
+    return parsed[codes]
+
+
+def _python_values(column: "pd.Series") -> list:
+    """Column values as plain Python objects for the DB driver, None where missing"""
+    import pandas as pd
+
+    values = column.to_numpy(dtype=object)
+    missing = pd.isna(values)
+    if missing.any():
+        values[missing] = None
+    return values.tolist()
+
+
+def line_records(df: "pd.DataFrame") -> list:
+    """visa_report_lines rows for a processed bundle, one per (report, line) key"""
+    import numpy as np
+
+    lines = df[list(LINE_COLUMNS)].rename(columns=LINE_COLUMNS)
+    # Dates and amounts are converted once, column-wise, on the way in
+    for col in DATE_COLUMNS:
+        lines[col] = _parse_dates(lines[col])
+    for col in MINOR_UNIT_COLUMNS:
+        lines[col] = np.rint(lines[col].to_numpy(dtype=np.float64) * 100).astype(np.int64)
+    # The same report twice in one upload: the later copy wins, as it would across uploads
+    duplicated = lines.duplicated(subset=LINE_KEY, keep='last')
+    if duplicated.any():
+        logger.warning("%d line(s) of reports uploaded twice were replaced by the later copy",
+                       int(duplicated.sum()))
+        lines = lines[~duplicated]
+
+    # Built column by column and zipped into rows, instead of converting the
+    # whole frame to objects and going through to_dict('records')
+    columns = []
+    for col in lines.columns:
+        if col in MINOR_UNIT_COLUMNS:
+            columns.append(lines[col].tolist())
+        elif col == 'count':
+            counts = lines[col].to_numpy(dtype=np.float64).tolist()
+            columns.append([None if count != count else int(count) for count in counts])
+        else:
+            columns.append(_python_values(lines[col]))
+    names = list(lines.columns)
+    return [dict(zip(names, row)) for row in zip(*columns)]
+
+
+def rollup_select(*conditions):
+    """visa_report_lines aggregated to the daily_settlement_rollup grain"""
+    lines = VisaReportLine.__table__
+    signed_total = case((lines.c.crdb_label == 'DB', -lines.c.total_minor), else_=lines.c.total_minor)
+    # Rows stored before settlement_currency existed have NULL there; the rollup key can't be NULL
+    key = [lines.c.proc_date] + [func.coalesce(lines.c[col], '') for col in ROLLUP_KEY[1:]]
+    return (
+        select(
+            *(expression.label(col) for expression, col in zip(key, ROLLUP_KEY)),
+            func.count().label('line_count'),
+            func.coalesce(func.sum(lines.c.count), 0).label('count'),
+            func.coalesce(func.sum(lines.c.credit_minor), 0).label('credit_minor'),
+            func.coalesce(func.sum(lines.c.debit_minor), 0).label('debit_minor'),
+            func.coalesce(func.sum(signed_total), 0).label('net_minor'),
+        )
+        .where(lines.c.proc_date.isnot(None), *conditions)
+        .group_by(*key)
+    )
+
+
+def _record_rollup(records: list) -> Dict[Tuple, List[int]]:
+    totals = defaultdict(lambda: [0] * len(ROLLUP_SUMS))
+    for rec in records:
+        if rec['proc_date'] is None:
+            continue
+        # NULL key columns count as '', as in rollup_select
+        sums = totals[tuple('' if rec[col] is None else rec[col] for col in ROLLUP_KEY)]
+        sums[0] += 1
+        sums[1] += rec['count'] or 0
+        sums[2] += rec['credit_minor']
+        sums[3] += rec['debit_minor']
+        sums[4] += -rec['total_minor'] if rec['crdb_label'] == 'DB' else rec['total_minor']
+    return totals
+
+
+def _upsert_statement(conn: Connection, table, key: List[str], sums: List[str]):
+    """INSERT ... ON CONFLICT (key) DO UPDATE SET sum = sum + excluded.sum"""
+    if conn.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    stmt = insert(table)
+    return stmt.on_conflict_do_update(
+        index_elements=key,
+        set_={col: table.c[col] + stmt.excluded[col] for col in sums},
+    )
+
+
+def _apply_rollup_deltas(conn: Connection, deltas: Dict[Tuple, List[int]]):
+    rollup = DailySettlementRollup.__table__
+    rows = [
+        dict(zip(ROLLUP_KEY, key), **dict(zip(ROLLUP_SUMS, sums)))
+        for key, sums in deltas.items() if any(sums)
+    ]
+    if rows:
+        conn.execute(_upsert_statement(conn, rollup, ROLLUP_KEY, ROLLUP_SUMS), rows)
+        # Days whose reports all moved elsewhere on re-upload
+        conn.execute(rollup.delete().where(rollup.c.line_count <= 0))
+
+
+def _key_conditions(key_columns: list, keys: List[Tuple]) -> list:
+    """
+    Conditions matching rows of any of the given keys. A NULL in a key (e.g.
+    a report without a PROC DATE) matches NULL, as with IS NOT DISTINCT FROM.
+    """
+    complete = [key for key in keys if None not in key]
+    conditions = [tuple_(*key_columns).in_(complete)] if complete else []
+    conditions += [
+        and_(*(column.is_not_distinct_from(value) for column, value in zip(key_columns, key)))
+        for key in keys if None in key
+    ]
+    return conditions
+
+
+def _report_key_condition(table, keys: List[Tuple]):
+    """Rows of any of the given report keys, stored before or after LATER_KEY_COLUMNS existed"""
+    earlier = [i for i, col in enumerate(REPORT_KEY) if col not in LATER_KEY_COLUMNS]
+    earlier_keys = list({tuple(key[i] for i in earlier): None for key in keys})
+    stored_before = and_(
+        table.c[LATER_KEY_COLUMNS[0]].is_(None),
+        or_(*_key_conditions([table.c[REPORT_KEY[i]] for i in earlier], earlier_keys)),
+    )
+    return or_(*_key_conditions([table.c[col] for col in REPORT_KEY], keys), stored_before)
+
+
+def save_report_lines(df: "pd.DataFrame", engine: Engine = default_engine) -> int:
+    """
+    Stores every line of a processed bundle in visa_report_lines.
+
+    Runs as one transaction: the previous rows of each uploaded report are
+    deleted and the new rows bulk inserted with executemany, so uploading the
+    same report again replaces it instead of duplicating it. The daily rollup
+    is adjusted in the same transaction by the difference between the old and
+    new rows of those reports, without rescanning the line table.
+
+    The old rows are taken from what the DELETE ... RETURNING actually removed
+    rather than read beforehand. The delete is also the transaction's first
+    statement, so SQLite holds the write lock from there on, and on Postgres a
+    concurrent upload of the same reports waits on their row locks. Either way
+    the rollup can't drift when uploads overlap.
+    """
+    records = line_records(df)
+    if not records:
+        return 0
+
+    table = VisaReportLine.__table__
+    report_keys = list({tuple(rec[col] for col in REPORT_KEY): None for rec in records})
+    returned = [table.c[col] for col in ROLLUP_RECORD_COLUMNS]
+
+    deltas = _record_rollup(records)
+
+    with engine.begin() as conn:
+        for start in range(0, len(report_keys), KEY_BATCH_SIZE):
+            batch = report_keys[start:start + KEY_BATCH_SIZE]
+            removed = conn.execute(
+                table.delete().where(_report_key_condition(table, batch)).returning(*returned)
+            ).mappings().all()
+            for key, sums in _record_rollup(removed).items():
+                new_sums = deltas[key]
+                for i, value in enumerate(sums):
+                    new_sums[i] -= value
+
+        conn.execute(table.insert(), records)
+        _apply_rollup_deltas(conn, deltas)
+
+    return len(records)
@@ -0,0 +1,119 @@
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .parser import LINE_INDEX, LINE_TYPES, ROW_LAYOUT
+
+# Output column naming the checks a report failed ('' when it reconciles)
+RECONCILIATION_COLUMN = 'Reconciliation'
+# Failed reports listed in a summary; it also goes out as a response header, which
+# proxies cap at a few KiB (the Reconciliation column has every one of them)
+SUMMARY_FAILURES = 20
+
+# (check name, positions of the lines that add up, position of the line they must equal, checks count)
+RECONCILIATION_CHECKS: List[Tuple[str, List[int], int, bool]] = [
+    (section, [LINE_INDEX[f"{section}_{line_type}"] for line_type in LINE_TYPES], LINE_INDEX[f"{section}_Total"],
+     section == 'Interchange')
+    for section in ['Interchange', 'Reimbursement', 'VisaCharges']
+] + [
+    ('NetSettlement', [LINE_INDEX[f"FinalTotal_{line_type}"] for line_type in LINE_TYPES],
+     LINE_INDEX['Settlement_Net'], False),
+]
+
+_ROWS = len(ROW_LAYOUT)
+
+
+def _cents(values: np.ndarray) -> np.ndarray:
+    """(reports, lines) integer cents, so sums compare exactly"""
+    return np.rint(np.nan_to_num(values.astype(np.float64)) * 100).astype(np.int64).reshape(-1, _ROWS)
+
+
+def reconcile(count: np.ndarray, credit: np.ndarray, debit: np.ndarray, signed_total: np.ndarray) -> np.ndarray:
+    """
+    Checks every report of a batch at once: within each section the ACQUIRER,
+    ISSUER and OTHER lines must add up to the section total (credit, debit,
+    signed total and, for interchange, count), and the three final TOTAL lines
+    must add up to the NET SETTLEMENT AMOUNT.
+
+    Takes the row columns of whole reports (ROW_LAYOUT order, ROWS_PER_REPORT
+    rows each) and returns one string per report naming the failed checks,
+    e.g. 'Interchange CreditAmount, NetSettlement TotalAmount', or ''.
+    """
+    fields = {
+        'Count': np.nan_to_num(count.astype(np.float64)).astype(np.int64).reshape(-1, _ROWS),
+        'CreditAmount': _cents(credit),
+        'DebitAmount': _cents(debit),
+        'TotalAmount': _cents(signed_total),
+    }
+    labels, failures = [], []
+    for name, parts, total, has_count in RECONCILIATION_CHECKS:
+        for field, values in fields.items():
+            if field == 'Count' and not has_count:
+                continue
+            labels.append(f"{name} {field}")
+            failures.append(values[:, parts].sum(axis=1) != values[:, total])
+
+    # One bit per check; the message is built once per distinct combination of failures
+    codes = np.zeros(len(fields['CreditAmount']), dtype=np.int64)
+    for bit, failed in enumerate(failures):
+        codes |= failed.astype(np.int64) << bit
+    distinct, inverse = np.unique(codes, return_inverse=True)
+    messages = np.array([
+        ', '.join(label for bit, label in enumerate(labels) if code >> bit & 1) for code in distinct.tolist()
+    ], dtype=object)
+    return messages[inverse]
+
+
+def reconcile_frame(df: pd.DataFrame) -> np.ndarray:
+    """reconcile() for a processed DataFrame (TotalAmount is absolute there, TotalType carries the sign)"""
+    signed_total = np.where(df['TotalType'].to_numpy() == 'DB', -1.0, 1.0) * df['TotalAmount'].to_numpy(np.float64)
+    return reconcile(df['Count'].to_numpy(), df['CreditAmount'].to_numpy(), df['DebitAmount'].to_numpy(),
+                     signed_total)
+
+
+def reconciliation_summary(df: pd.DataFrame, limit: int = SUMMARY_FAILURES) -> Dict:
+    """Failed reports of a processed DataFrame, for API responses (at most `limit` listed)"""
+    if RECONCILIATION_COLUMN not in df.columns:
+        return {"reports_checked": 0, "reports_failed": 0, "failures": []}
+    problems = df[RECONCILIATION_COLUMN].to_numpy()[::_ROWS]
+    failed = np.flatnonzero(problems != '')
+    listed = df.iloc[failed[:limit] * _ROWS]
+    return {
+        "reports_checked": len(problems),
+        "reports_failed": len(failed),
+        # report is the 1-based position of the report in the upload
+        "failures": [
+            {"report": int(position) + 1, "ReportID": report_id, "ProcDate": proc_date,
+             "ReportingFor": reporting_for, "problems": problems[position]}
+            for position, report_id, proc_date, reporting_for in zip(
+                failed[:limit], listed['ReportID'], listed['ProcDate'], listed['ReportingFor']
+            )
+        ],
+    }
+
+
+class ReconciliationTally:
+    """reconciliation_summary across the batches of one upload, as they go by"""
+
+    def __init__(self, limit: int = SUMMARY_FAILURES):
+        self.limit = limit
+        self.checked = 0
+        self.failed = 0
+        self.failures: List[Dict] = []
+
+    def add(self, df: pd.DataFrame):
+        summary = reconciliation_summary(df, self.limit - len(self.failures))
+        for failure in summary["failures"]:
+            failure["report"] += self.checked
+        self.failures.extend(summary["failures"])
+        self.checked += summary["reports_checked"]
+        self.failed += summary["reports_failed"]
+
+    def track(self, frames: Iterable[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+        for df in frames:
+            self.add(df)
+            yield df
+
+    def summary(self) -> Dict:
+        return {"reports_checked": self.checked, "reports_failed": self.failed, "failures": self.failures}
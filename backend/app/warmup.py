@@ -0,0 +1,55 @@
+"""
+Loads the heavy dependencies of the upload pipeline ahead of the first upload.
+
+app.main imports none of pandas, numpy or openpyxl, so a worker is serving
+within a fraction of a second; warmup() then imports them together with the
+modules built on them. Pre-fork servers can run it once in the parent so
+every forked worker shares the loaded modules, e.g. in a gunicorn config:
+
+    def on_starting(server):
+        from app.warmup import warmup
+        warmup()
+"""
+import importlib
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Imported on first use by the upload routes and export writers
+PIPELINE_MODULES = (
+    "numpy",
+    "pandas",
+    "app.validation",
+    "app.columnar",
+    "openpyxl",
+    "openpyxl.cell",
+    "openpyxl.styles",
+    "openpyxl.utils",
+)
+
+
+def warmup() -> float:
+    """Imports PIPELINE_MODULES; returns the seconds it took"""
+    start = time.perf_counter()
+    for name in PIPELINE_MODULES:
+        importlib.import_module(name)
+    seconds = time.perf_counter() - start
+    logger.info("Upload pipeline loaded in %.2fs", seconds)
+    return seconds
+
+
+def _warmup_logged():
+    try:
+        warmup()
+    except Exception:
+        # The first upload imports whatever is missing, and reports the error itself
+        logger.exception("Loading the upload pipeline ahead of time failed")
+
+
+def start_warmup() -> threading.Thread:
+    """warmup() on a daemon thread, so startup doesn't wait for it"""
+    thread = threading.Thread(target=_warmup_logged, name="visa-warmup", daemon=True)
+    thread.start()
+    return thread
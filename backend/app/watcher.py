@@ -0,0 +1,193 @@
+"""
+Tails a drop directory of VSS-110 bundles and stores new reports as they land.
+
+    python -m app.watcher --directory /srv/visa-drop
+
+Files are read incrementally: only bytes appended since the last scan are
+read, and only reports whose END OF REPORT delimiter has arrived are stored.
+"""
+import argparse
+import fnmatch
+import json
+import logging
+import os
+import threading
+from concurrent.futures import Executor
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy.engine import Engine
+
+from .config import WATCH_CHECKPOINT, WATCH_DIR, WATCH_INTERVAL_SECONDS, WATCH_PATTERN, WATCH_READ_BYTES
+from .database import engine as default_engine
+from .ingest import REPORT_DELIMITER, split_reports
+from .logs import configure_logging, shutdown_logging
+from .metrics import ROWS_STORED
+from .migrations import migrate
+from .parallel import get_parse_executor, shutdown_parse_executor
+from .parser import ROWS_PER_REPORT
+from .routes import process_multiple_visa_reports
+from .storage import save_report_lines
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_FILENAME = ".visa-watch-offsets.json"
+_DELIMITER = REPORT_DELIMITER.encode("utf-8")
+
+
+def complete_segments(fileobj: BinaryIO, offset: int, read_bytes: int) -> Iterator[Tuple[bytes, int]]:
+    """
+    (bytes, end offset) pieces of a file from `offset` on, each ending right
+    after a report delimiter. Whatever follows the last delimiter is a report
+    still being written and is left for a later scan.
+    """
+    fileobj.seek(offset)
+    pending = b""
+    while chunk := fileobj.read(read_bytes):
+        pending += chunk
+        end = pending.rfind(_DELIMITER)
+        if end < 0:
+            continue
+        end += len(_DELIMITER)
+        offset += end
+        yield pending[:end], offset
+        pending = pending[end:]
+
+
+class DropWatcher:
+    """
+    Stores the reports appended to the files of a drop directory.
+
+    The byte offset just past the last stored report of every file is kept in
+    a JSON checkpoint, moved on only once that report's rows are committed, so
+    a restart resumes where the last commit left off instead of re-reading
+    whole files. A file that shrinks or is replaced (new inode) is read from
+    the start again; storing a report a second time replaces its rows.
+    """
+
+    def __init__(self, directory: str, pattern: str = WATCH_PATTERN, checkpoint_path: Optional[str] = None,
+                 read_bytes: int = WATCH_READ_BYTES, executor: Optional[Executor] = None,
+                 engine: Engine = default_engine):
+        self.directory = directory
+        self.pattern = pattern
+        self.checkpoint_path = checkpoint_path or os.path.join(directory, CHECKPOINT_FILENAME)
+        self.read_bytes = read_bytes
+        self.executor = executor
+        self.engine = engine
+        # file name -> {"inode": ..., "offset": ...}
+        self.offsets: Dict[str, Dict[str, int]] = self._load_checkpoint()
+
+    def _load_checkpoint(self) -> Dict[str, Dict[str, int]]:
+        try:
+            with open(self.checkpoint_path, encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable checkpoint %s (%s); reading every file again",
+                           self.checkpoint_path, e)
+            return {}
+
+    def _save_checkpoint(self):
+        tmp_path = f"{self.checkpoint_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.offsets, f)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def files(self) -> List[str]:
+        """Names of the report files currently in the directory"""
+        checkpoint = os.path.abspath(self.checkpoint_path)
+        return sorted(
+            entry.name for entry in os.scandir(self.directory)
+            if entry.is_file()
+            and not entry.name.startswith(".")
+            and fnmatch.fnmatch(entry.name, self.pattern)
+            and os.path.abspath(entry.path) != checkpoint
+        )
+
+    def poll(self) -> int:
+        """One scan of the directory; returns the number of rows stored"""
+        names = self.files()
+        stored = sum(self._tail(name) for name in names)
+
+        removed = set(self.offsets) - set(names)
+        if removed:
+            for name in removed:
+                del self.offsets[name]
+            self._save_checkpoint()
+        return stored
+
+    def _tail(self, name: str) -> int:
+        try:
+            f = open(os.path.join(self.directory, name), "rb")
+        except OSError:  # removed since the scan
+            return 0
+
+        with f:
+            stat = os.fstat(f.fileno())
+            state = self.offsets.get(name)
+            offset = 0
+            if state is not None:
+                if state["inode"] == stat.st_ino and state["offset"] <= stat.st_size:
+                    offset = state["offset"]
+                else:
+                    logger.info("%s was replaced or truncated; reading it from the start", name)
+                    self.offsets[name] = {"inode": stat.st_ino, "offset": 0}
+                    self._save_checkpoint()
+            if offset == stat.st_size:
+                return 0
+
+            stored = 0
+            for segment, end in complete_segments(f, offset, self.read_bytes):
+                stored += self._store(name, segment.decode("utf-8", errors="replace"))
+                self.offsets[name] = {"inode": stat.st_ino, "offset": end}
+                self._save_checkpoint()
+            return stored
+
+    def _store(self, name: str, text: str) -> int:
+        df = process_multiple_visa_reports(split_reports(text), self.executor)
+        rows = save_report_lines(df, self.engine)
+        ROWS_STORED.inc(rows)
+        logger.info("%s: stored %d rows from %d reports", name, rows, len(df) // ROWS_PER_REPORT)
+        return rows
+
+    def run(self, interval: float = WATCH_INTERVAL_SECONDS, stop: Optional[threading.Event] = None):
+        """Scans every `interval` seconds until `stop` is set"""
+        stop = stop or threading.Event()
+        while not stop.is_set():
+            try:
+                self.poll()
+            except Exception:
+                # Nothing past the last commit was checkpointed, so the next scan retries it
+                logger.exception("Scanning %s failed", self.directory)
+            stop.wait(interval)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Store VSS-110 reports as they are appended to a drop directory")
+    parser.add_argument("--directory", default=WATCH_DIR, required=WATCH_DIR is None,
+                        help="Directory to watch (default: VISA_WATCH_DIR)")
+    parser.add_argument("--pattern", default=WATCH_PATTERN, help="Glob of the files to tail (default: %(default)s)")
+    parser.add_argument("--checkpoint", default=WATCH_CHECKPOINT,
+                        help=f"Offsets file (default: {CHECKPOINT_FILENAME} in the directory)")
+    parser.add_argument("--interval", type=float, default=WATCH_INTERVAL_SECONDS,
+                        help="Seconds between scans (default: %(default)s)")
+    parser.add_argument("--once", action="store_true", help="Scan once and exit")
+    args = parser.parse_args(argv)
+
+    configure_logging()
+    migrate(default_engine)
+    watcher = DropWatcher(args.directory, args.pattern, args.checkpoint, executor=get_parse_executor())
+    try:
+        if args.once:
+            watcher.poll()
+        else:
+            watcher.run(args.interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        shutdown_parse_executor()
+        shutdown_logging()
+
+
+if __name__ == "__main__":
+    main()
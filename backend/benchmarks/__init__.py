@@ -0,0 +1,9 @@
+"""
+Ingest benchmarks for the VSS-110 pipeline.
+
+Run from the backend directory:
+
+    python -m benchmarks.run                      # 1, 100, 10k and 100k reports
+    python -m benchmarks.run --sizes 1,100 --stages parse,excel
+    python -m benchmarks.compare results/a.json results/b.json
+"""
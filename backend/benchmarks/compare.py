@@ -0,0 +1,32 @@
+import argparse
+import json
+from typing import Dict, List, Optional, Tuple
+
+
+def _load(path: str) -> Tuple[Dict, Dict[Tuple[int, str], Dict]]:
+    with open(path) as fh:
+        run = json.load(fh)
+    timed = {(r["reports"], r["stage"]): r for r in run["results"] if "seconds" in r}
+    return run, timed
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    args = parser.parse_args(argv)
+
+    base_run, base = _load(args.baseline)
+    cand_run, cand = _load(args.candidate)
+    print(f"baseline  {base_run.get('commit')}  {base_run.get('started_at')}")
+    print(f"candidate {cand_run.get('commit')}  {cand_run.get('started_at')}")
+    print(f"{'reports':>8}  {'stage':<10} {'baseline':>10} {'candidate':>10} {'speedup':>8} {'RSS MB':>15}")
+    for key in sorted(base.keys() & cand.keys()):
+        old, new = base[key], cand[key]
+        speedup = old["seconds"] / new["seconds"] if new["seconds"] else float("inf")
+        rss = f"{old.get('peak_rss_mb')} -> {new.get('peak_rss_mb')}"
+        print(f"{key[0]:>8}  {key[1]:<10} {old['seconds']:>9.3f}s {new['seconds']:>9.3f}s {speedup:>7.2f}x {rss:>15}")
+
+
+if __name__ == "__main__":
+    main()
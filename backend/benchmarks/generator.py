@@ -0,0 +1,113 @@
+import random
+from typing import Iterator, Optional, TextIO
+
+from app.ingest import REPORT_DELIMITER
+
+LINE_TYPES = ["ACQUIRER", "ISSUER", "OTHER"]
+CURRENCIES = ["USD", "BDT", "EUR"]
+MONTHS = ["JAN", "FEB", "MAR", "APR", "MAY", "JUN", "JUL", "AUG", "SEP", "OCT", "NOV", "DEC"]
+
+# (section heading, total line label, has a COUNT column)
+SECTIONS = [
+    ("INTERCHANGE VALUE", "TOTAL INTERCHANGE VALUE", True),
+    ("REIMBURSEMENT FEES", "TOTAL REIMBURSEMENT FEES", False),
+    ("VISA CHARGES", "TOTAL VISA CHARGES", False),
+]
+
+
+def format_amount(value: float) -> str:
+    """Amount the way VSS-110 prints it: thousands separators and a CR/DB suffix for signed totals"""
+    text = f"{abs(value):,.2f}"
+    if value > 0:
+        return text + "CR"
+    if value < 0:
+        return text + "DB"
+    return text
+
+
+class BundleGenerator:
+    """
+    Deterministic generator of realistic VSS-110 bundles.
+
+    The same seed always produces the same text. Amounts mix credits, debits
+    and zeros, and every total adds up: section totals over their lines, the
+    final TOTAL lines over the sections and the net settlement over those.
+    `missing_rate` is the share of reports that lack one of their sections, and
+    header spacing varies from report to report.
+    """
+
+    def __init__(self, seed: int = 0, missing_rate: float = 0.1, max_amount: float = 250_000.0):
+        self.rng = random.Random(seed)
+        self.missing_rate = missing_rate
+        self.max_amount = max_amount
+
+    def _amount(self) -> float:
+        return round(self.rng.uniform(0, self.max_amount), 2) if self.rng.random() < 0.7 else 0.0
+
+    def _line(self, label: str, credit: float, debit: float, count: Optional[int] = None, indent: int = 5) -> str:
+        count_text = f"{count:>10,}" if count is not None else " " * 10
+        return (f"{' ' * indent}{label:<32}{count_text}{credit:>22,.2f}{debit:>22,.2f}"
+                f"{format_amount(round(credit - debit, 2)):>24}")
+
+    def report(self, index: int) -> str:
+        rng = self.rng
+        gap = " " * rng.randint(2, 6)
+        proc_day = rng.randint(1, 28)
+        month = rng.choice(MONTHS)
+        missing = rng.choice(SECTIONS)[0] if rng.random() < self.missing_rate else None
+
+        lines = [
+            f"REPORT ID:  VSS-110                          VISANET SETTLEMENT SERVICE                PAGE:   {index + 1}",
+            f"REPORTING FOR:{gap}{1000670600 + index % 97} BIN 403993 INTL    INTERNATIONAL SETTLEMENT SERVICE"
+            f"   PROC DATE:   {proc_day:02d}{month}25",
+            f"ROLLUP TO:{gap}1000313555 BA INT            VSS SETTLEMENT SUMMARY             "
+            f"REPORT DATE:   {min(proc_day + 1, 28):02d}{month}25",
+            f"FUNDS XFER ENTITY:{gap}1000313555 BA INT{' ' * rng.randint(0, 4)}",
+            f"SETTLEMENT CURRENCY: {rng.choice(CURRENCIES)}",
+            "",
+            " " * 53 + "COUNT         CREDIT AMOUNT          DEBIT AMOUNT          TOTAL AMOUNT",
+        ]
+        # Everything is summed in cents, so the totals reconcile exactly (see app.validation)
+        final_credit, final_debit = [0] * len(LINE_TYPES), [0] * len(LINE_TYPES)
+        for heading, total_label, has_count in SECTIONS:
+            if heading == missing:
+                continue
+            lines.append(heading)
+            credit_total = debit_total = count_total = 0
+            for i, line_type in enumerate(LINE_TYPES):
+                credit, debit, count = self._amount(), self._amount(), rng.randint(0, 5000)
+                credit_total += round(credit * 100)
+                debit_total += round(debit * 100)
+                count_total += count
+                final_credit[i] += round(credit * 100)
+                final_debit[i] += round(debit * 100)
+                lines.append(self._line("TOTAL " + line_type, credit, debit, count if has_count else None))
+            lines.append(self._line(total_label, credit_total / 100, debit_total / 100,
+                                    count_total if has_count else None, indent=0))
+            lines.append("")
+        lines.append("TOTAL")
+        for i, line_type in enumerate(LINE_TYPES):
+            lines.append(self._line("TOTAL " + line_type, final_credit[i] / 100, final_debit[i] / 100))
+        lines.append("")
+        lines.append(self._line("NET SETTLEMENT AMOUNT", sum(final_credit) / 100, sum(final_debit) / 100, indent=0))
+        lines.append("")
+        lines.append(REPORT_DELIMITER)
+        return "\n".join(lines)
+
+    def iter_reports(self, n_reports: int) -> Iterator[str]:
+        for index in range(n_reports):
+            yield self.report(index)
+
+
+def generate_bundle(n_reports: int, seed: int = 0, missing_rate: float = 0.1) -> str:
+    """Whole bundle text with `n_reports` reports"""
+    return "\n\n".join(BundleGenerator(seed, missing_rate).iter_reports(n_reports)) + "\n"
+
+
+def write_bundle(target: TextIO, n_reports: int, seed: int = 0, missing_rate: float = 0.1) -> int:
+    """Writes a bundle report by report, so large ones never sit in memory; returns characters written"""
+    written = 0
+    for report in BundleGenerator(seed, missing_rate).iter_reports(n_reports):
+        written += target.write(report)
+        written += target.write("\n\n")
+    return written
@@ -0,0 +1,91 @@
+"""
+Import-time budget for app startup.
+
+    python -m benchmarks.imports --budget-ms 1000
+
+Imports app.main in fresh interpreters under `python -X importtime` and fails
+(exit status 1) when the best run goes over the budget, or when any module
+that is meant to load lazily (pandas, numpy, openpyxl, pyarrow) was imported
+with the app. tests/test_import_time.py checks the lazy packages alone with
+the test suite; VISA_IMPORT_BUDGET_MS raises the default budget on slow machines.
+"""
+import argparse
+import os
+import subprocess
+import sys
+from typing import Dict, List, Optional, Tuple
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_MODULE = "app.main"
+DEFAULT_BUDGET_MS = float(os.getenv("VISA_IMPORT_BUDGET_MS", "1000"))
+# Top-level packages app.main must not import; the upload routes load them on first use
+LAZY_PACKAGES = ("pandas", "numpy", "openpyxl", "pyarrow")
+
+# name -> (self µs, cumulative µs)
+ImportTimes = Dict[str, Tuple[int, int]]
+
+
+def import_times(module: str = DEFAULT_MODULE) -> ImportTimes:
+    """-X importtime figures for importing `module` in a fresh interpreter"""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, cwd=BACKEND_DIR,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"importing {module} failed:\n{completed.stderr}")
+
+    times = {}
+    for line in completed.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+
+def best_import_times(module: str = DEFAULT_MODULE, runs: int = 3) -> ImportTimes:
+    """import_times() of the fastest of `runs` fresh interpreters, which is the least noisy figure"""
+    return min((import_times(module) for _ in range(max(1, runs))), key=lambda times: times[module][1])
+
+
+def total_ms(times: ImportTimes, module: str = DEFAULT_MODULE) -> float:
+    return times[module][1] / 1000
+
+
+def eager_packages(times: ImportTimes) -> List[str]:
+    """LAZY_PACKAGES that were imported anyway"""
+    return sorted({name.split(".")[0] for name in times} & set(LAZY_PACKAGES))
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Check the import time of the app against a budget")
+    parser.add_argument("--module", default=DEFAULT_MODULE, help="Module to import (default: %(default)s)")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS,
+                        help="Most milliseconds the import may take (default: %(default)s)")
+    parser.add_argument("--runs", type=int, default=3,
+                        help="Fresh interpreters to time; the fastest counts (default: %(default)s)")
+    parser.add_argument("--top", type=int, default=10, help="Slowest imports to list (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    best = best_import_times(args.module, args.runs)
+    took_ms = total_ms(best, args.module)
+
+    print(f"{args.module} imported in {took_ms:.1f} ms (best of {args.runs}, budget {args.budget_ms:.0f} ms)")
+    print(f"{'self ms':>9} {'cumul. ms':>10}  module")
+    for name, (self_us, cumulative_us) in sorted(best.items(), key=lambda item: -item[1][0])[:args.top]:
+        print(f"{self_us / 1000:>9.1f} {cumulative_us / 1000:>10.1f}  {name}")
+
+    failures = []
+    if took_ms > args.budget_ms:
+        failures.append(f"import took {took_ms:.1f} ms, over the {args.budget_ms:.0f} ms budget")
+    eager = eager_packages(best)
+    if eager:
+        failures.append(f"imported at startup but meant to load lazily: {', '.join(eager)}")
+    if failures:
+        parser.exit(1, "".join(f"FAIL: {failure}\n" for failure in failures))
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from .generator import write_bundle
+
+DEFAULT_SIZES = [1, 100, 10_000, 100_000]
+STAGES = ["split", "parse", "transform", "excel", "sqlite"]
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+# Excel stops at 1,048,576 rows per sheet, header included
+EXCEL_MAX_ROWS = 1_048_575
+
+
+def peak_rss_mb() -> Optional[float]:
+    """High-water mark of this process' resident memory"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _timed(stage: str, n_reports: int, fn: Callable):
+    start = time.perf_counter()
+    value = fn()
+    seconds = time.perf_counter() - start
+    result = {
+        "reports": n_reports,
+        "stage": stage,
+        "seconds": round(seconds, 6),
+        "reports_per_second": round(n_reports / seconds, 1) if seconds else None,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    return value, result
+
+
+def run_size(n_reports: int, stages: List[str], seed: int) -> List[Dict]:
+    """
+    Benchmarks one bundle size. Meant to run in a fresh process so that the
+    peak RSS of each size is not inflated by the previous ones; within a size
+    the peak is cumulative over the stages run so far.
+    """
+    from app.columnar import ROWS_PER_REPORT, ReportBatchBuilder
+    from app.exports import excel_artifact, sqlite_artifact
+    from app.ingest import iter_file_reports
+    from app.parser import extract_visa_report
+
+    results = []
+    with tempfile.TemporaryFile("w+b") as upload:
+        text = io.TextIOWrapper(upload, encoding="utf-8", newline="")
+        write_bundle(text, n_reports, seed)
+        text.flush()
+        size_bytes = upload.tell()
+        text.detach()
+
+        reports, result = _timed("split", n_reports, lambda: list(iter_file_reports(upload)))
+        result["bytes"] = size_bytes
+        if "split" in stages:
+            results.append(result)
+
+    parsed, result = _timed("parse", n_reports, lambda: [extract_visa_report(report) for report in reports])
+    if "parse" in stages:
+        results.append(result)
+    del reports
+    if not set(stages) & {"transform", "excel", "sqlite"}:
+        return results
+
+    def transform():
+        builder = ReportBatchBuilder()
+        for data in parsed:
+            builder.add(data)
+        return builder.to_frame()
+
+    df, result = _timed("transform", n_reports, transform)
+    if "transform" in stages:
+        results.append(result)
+    del parsed
+
+    for stage, build in (("excel", excel_artifact), ("sqlite", sqlite_artifact)):
+        if stage not in stages:
+            continue
+        if stage == "excel" and n_reports * ROWS_PER_REPORT > EXCEL_MAX_ROWS:
+            results.append({"reports": n_reports, "stage": stage, "skipped": "exceeds the Excel row limit"})
+            continue
+        artifact, result = _timed(stage, n_reports, lambda: build(df))
+        artifact.seek(0, os.SEEK_END)
+        result["bytes"] = artifact.tell()
+        artifact.close()
+        results.append(result)
+    return results
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(__file__)
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Benchmark the VSS-110 ingest pipeline")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="Comma separated report counts (default: %(default)s)")
+    parser.add_argument("--stages", default=",".join(STAGES),
+                        help="Comma separated stages out of %(default)s")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Result file (default: results/<timestamp>-<commit>.json)")
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    stages = [stage.strip() for stage in args.stages.split(",")]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(sorted(unknown))}")
+
+    commit = _git_commit()
+    started = datetime.now(timezone.utc)
+    results = []
+    for n_reports in sizes:
+        # One fresh process per size keeps peak RSS figures independent
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+            size_results = pool.submit(run_size, n_reports, stages, args.seed).result()
+        for result in size_results:
+            if "skipped" in result:
+                print(f"{n_reports:>8} reports  {result['stage']:<10} skipped: {result['skipped']}")
+            else:
+                print(f"{n_reports:>8} reports  {result['stage']:<10} {result['seconds']:>10.3f}s"
+                      f"  peak RSS {result['peak_rss_mb']} MB")
+        results.extend(size_results)
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{started:%Y%m%dT%H%M%SZ}-{commit or 'nocommit'}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as fh:
+        json.dump({
+            "commit": commit,
+            "started_at": started.isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "seed": args.seed,
+            "results": results,
+        }, fh, indent=2)
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
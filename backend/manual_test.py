@@ -1,19 +1,23 @@
-import pandas as pd
 import os
 
-# Ask user for Excel file path
+from app.filters import OPERATORS, FilterError, filter_file, parse_value, read_chunks
+
+# Interactive front end for app.filters; for scripts use:
+#   python -m app.filters report.xlsx filtered.xlsx --where Count '>=' 10
+
+# Ask user for the file path (.xlsx, .csv, .parquet or .db)
 file_path = input("Enter the full path to your Excel file: ")
 
-# Load file
+# Only the first chunk is loaded to list the columns
 try:
-    df = pd.read_excel(file_path)
+    columns = next(read_chunks(file_path, chunk_rows=1)).columns
 except Exception as e:
     print(f"❌ Error loading file: {e}")
     exit()
 
 # Show column names
 print("\nAvailable columns:")
-print(df.columns.tolist())
+print(columns.tolist())
 
 # Ask how many filters to apply
 num_filters = int(input("\nHow many filters would you like to apply? "))
@@ -25,37 +29,18 @@ for i in range(num_filters):
     operation = input("Operation (=, !=, >, <, >=, <=): ")
     value = input("Value: ")
 
-    try:
-        value = float(value)
-    except:
-        pass
-
-    filters.append({
-        "column": column,
-        "operation": operation,
-        "value": value
-    })
-
-# Apply filters using operator functions
-ops = {
-    "=": lambda x, y: x == y,
-    "!=": lambda x, y: x != y,
-    ">": lambda x, y: x > y,
-    "<": lambda x, y: x < y,
-    ">=": lambda x, y: x >= y,
-    "<=": lambda x, y: x <= y,
-}
-
-for rule in filters:
-    col, op, val = rule["column"], rule["operation"], rule["value"]
-    if op not in ops:
-        print(f"⚠️ Unsupported operation: {op}")
+    if operation not in OPERATORS:
+        print(f"⚠️ Unsupported operation: {operation}")
         continue
-    df = df[ops[op](df[col], val)]
+    filters.append((column, operation, parse_value(value)))
 
-# Save result to Desktop
+# Save result to Desktop; the file is filtered and written chunk by chunk
 desktop = os.path.join(os.path.expanduser("~"), "Desktop")
 output_path = os.path.join(desktop, "filtered_test_output.xlsx")
-df.to_excel(output_path, index=False)
+try:
+    written = filter_file(file_path, output_path, filters)
+except FilterError as e:
+    print(f"❌ {e}")
+    exit()
 
-print(f"\n✅ Filtered file saved to: {output_path}")
+print(f"\n✅ {written} filtered rows saved to: {output_path}")
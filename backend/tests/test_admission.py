@@ -0,0 +1,68 @@
+import asyncio
+
+from app.admission import AdmissionControl, ProcessingPool
+from app.config import RETRY_AFTER_SECONDS
+
+
+def _request(path: str = "/process-visa-report"):
+    return {"type": "http", "method": "POST", "path": path, "headers": []}
+
+
+def _call(middleware, scope, receive):
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(middleware(scope, receive, send))
+    return sent
+
+
+def test_over_capacity_upload_is_refused_before_its_body_is_read():
+    pool = ProcessingPool(workers=1, queue_size=0)
+    held = pool.acquire()
+    read = []
+
+    async def receive():
+        read.append(True)
+        return {"type": "http.request", "body": b"report", "more_body": False}
+
+    async def app(scope, receive, send):
+        raise AssertionError("the route must not run")
+
+    sent = _call(AdmissionControl(app, ["/process-visa-report"], pool), _request(), receive)
+    assert sent[0]["status"] == 429
+    assert (b"retry-after", str(RETRY_AFTER_SECONDS).encode()) in sent[0]["headers"]
+    assert read == []
+    held.release()
+
+
+def test_slot_is_held_until_the_response_is_sent():
+    pool = ProcessingPool(workers=1, queue_size=0)
+    free_while_streaming = []
+
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        for _ in range(3):
+            slot = pool.acquire()
+            free_while_streaming.append(slot is not None)
+            await send({"type": "http.response.body", "body": b"rows", "more_body": True})
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+    sent = _call(AdmissionControl(app, ["/process-visa-report"], pool), _request(), None)
+    assert sent[0]["status"] == 200
+    assert free_while_streaming == [False] * 3
+    assert pool.acquire() is not None
+
+
+def test_other_paths_are_not_admitted():
+    pool = ProcessingPool(workers=1, queue_size=0)
+    held = pool.acquire()
+
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+    sent = _call(AdmissionControl(app, ["/process-visa-report"], pool), _request("/reports/lines"), None)
+    assert sent[0]["status"] == 200
+    held.release()
@@ -0,0 +1,24 @@
+from app.cache import ParseCache, report_key
+from app.ingest import split_reports
+from app.parallel import parse_reports
+from app.parser import PARSE_FORMAT_VERSION, extract_visa_report
+from benchmarks.generator import generate_bundle
+
+
+def test_key_changes_with_parser_format_version():
+    report = next(split_reports(generate_bundle(1)))
+    assert report_key(report) == report_key(report, PARSE_FORMAT_VERSION)
+    assert report_key(report, PARSE_FORMAT_VERSION + 1) != report_key(report)
+
+
+def test_disk_entries_of_an_older_format_are_not_served(tmp_path):
+    report = next(split_reports(generate_bundle(1)))
+    old = ParseCache(10, str(tmp_path))
+    old.put(report_key(report, PARSE_FORMAT_VERSION - 1), {"ReportID": "stale"})
+
+    # A fresh process: empty memory tier, same directory
+    cache = ParseCache(10, str(tmp_path))
+    [(_, parsed, error)] = list(parse_reports([report], cache=cache))
+    assert error is None
+    assert parsed.to_dict() == extract_visa_report(report).to_dict()
+    assert cache.get(report_key(report)) == parsed.to_dict()
@@ -0,0 +1,32 @@
+import threading
+
+import pytest
+from sqlalchemy import text
+
+from app.config import DB_POOL_SIZE
+from app.database import make_engine
+from app.migrations import MIGRATIONS, migrate
+
+
+@pytest.mark.parametrize("url", ["sqlite://", "sqlite:///:memory:"])
+def test_in_memory_engine_is_one_database_for_every_thread(url):
+    engine = make_engine(url)
+    migrate(engine)
+    versions = []
+
+    def read_version():
+        with engine.connect() as conn:
+            versions.append(conn.execute(text("SELECT version FROM schema_version")).scalar())
+
+    thread = threading.Thread(target=read_version)
+    thread.start()
+    thread.join()
+    read_version()
+    assert versions == [len(MIGRATIONS)] * 2
+    engine.dispose()
+
+
+def test_file_engine_keeps_its_pool_size(tmp_path):
+    engine = make_engine(f"sqlite:///{tmp_path / 'visa_reports.db'}")
+    assert engine.pool.size() == DB_POOL_SIZE
+    engine.dispose()
@@ -0,0 +1,15 @@
+import subprocess
+import sys
+
+from benchmarks.imports import BACKEND_DIR, DEFAULT_MODULE, LAZY_PACKAGES
+
+# The timing budget is left to `python -m benchmarks.imports`, wall-clock
+# figures are too noisy for a unit test on a shared runner
+
+
+def test_heavy_packages_are_not_imported_at_startup():
+    # A fresh interpreter, so whatever the other tests imported doesn't count
+    code = f"import sys, {DEFAULT_MODULE}; print(' '.join(p for p in {LAZY_PACKAGES!r} if p in sys.modules))"
+    completed = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=BACKEND_DIR)
+    assert completed.returncode == 0, completed.stderr
+    assert completed.stdout.split() == []
@@ -0,0 +1,23 @@
+import io
+
+import pytest
+
+from app.ingest import REPORT_DELIMITER, count_file_reports, iter_file_reports
+from benchmarks.generator import generate_bundle
+
+BUNDLES = {
+    "generated": generate_bundle(50, seed=21),
+    "crlf": generate_bundle(20, seed=22).replace("\n", "\r\n"),
+    "no_final_delimiter": generate_bundle(20, seed=23).rstrip().rsplit(REPORT_DELIMITER, 1)[0],
+    "blank_reports": f"\n{REPORT_DELIMITER}\n \n{REPORT_DELIMITER}" + generate_bundle(5, seed=24) + "\n\n",
+    "empty": "",
+}
+
+
+@pytest.mark.parametrize("name", BUNDLES)
+@pytest.mark.parametrize("chunk_size", [7, len(REPORT_DELIMITER) - 1, len(REPORT_DELIMITER), 4096])
+def test_count_file_reports_matches_iter_file_reports(name, chunk_size):
+    upload = io.BytesIO(BUNDLES[name].encode())
+    expected = sum(1 for _ in iter_file_reports(upload, chunk_size))
+    assert count_file_reports(upload, chunk_size) == expected
+    assert upload.tell() == 0
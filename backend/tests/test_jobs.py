@@ -0,0 +1,33 @@
+import io
+import os
+import time
+
+from app.jobs import FAILED, JobQueue
+
+
+def _wait_until_finished(job, timeout: float = 10.0):
+    deadline = time.monotonic() + timeout
+    while job.snapshot()["finished_at"] is None:
+        assert time.monotonic() < deadline, "job did not finish"
+        time.sleep(0.01)
+
+
+def test_failed_job_leaves_no_partial_result(tmp_path):
+    queue = JobQueue(workers=1, directory=str(tmp_path))
+    job_id = queue.spool(io.BytesIO(b"upload"))
+
+    def run(job):
+        path = queue.path(job.id, "csv")
+        job.update(result_path=path)
+        with open(path, "wb") as target:
+            target.write(b"half a result")
+            raise RuntimeError("export failed")
+
+    job = queue.submit(job_id, "upload.txt", "csv", run)
+    try:
+        _wait_until_finished(job)
+        assert job.snapshot()["status"] == FAILED
+        # Not even the TTL purge is needed to get rid of it
+        assert os.listdir(tmp_path) == []
+    finally:
+        queue.shutdown()
@@ -0,0 +1,30 @@
+from concurrent.futures import Executor, Future
+
+from app.ingest import split_reports
+from app.parallel import parse_reports
+from benchmarks.generator import generate_bundle
+
+
+class InlineExecutor(Executor):
+    """Runs every task as it is submitted; knows nothing of its worker count"""
+
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        future.set_result(fn(*args, **kwargs))
+        return future
+
+
+def test_in_flight_window_follows_the_worker_count():
+    reports = list(split_reports(generate_bundle(40, seed=8)))
+    read = []
+
+    def stream():
+        for report in reports:
+            read.append(report)
+            yield report
+
+    results = parse_reports(stream(), InlineExecutor(), chunk_size=2, cache=None, workers=3)
+    next(results)
+    # Two chunks per worker are read before the first result comes back
+    assert len(read) == 2 * 3 * 2
+    assert [idx for idx, _, _ in results] == list(range(1, len(reports)))
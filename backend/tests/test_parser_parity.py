@@ -0,0 +1,71 @@
+import contextlib
+import io
+import random
+
+import pandas as pd
+import pytest
+
+from app.ingest import REPORT_DELIMITER
+from app.parser import parse_visa_report
+from app.routes import process_multiple_visa_reports
+from app.validation import RECONCILIATION_COLUMN
+from benchmarks.generator import generate_bundle
+
+import legacy_parser
+
+N_REPORTS = 120
+
+
+def _split(bundle: str):
+    """Reports of a bundle the way the legacy pipeline cut them up"""
+    return [report.strip() for report in bundle.strip().split(REPORT_DELIMITER) if report.strip()]
+
+
+def _drop_lines(bundle: str, seed: int) -> str:
+    """One line removed at random from every report"""
+    rng = random.Random(seed)
+    reports = []
+    for report in _split(bundle):
+        lines = report.split("\n")
+        del lines[rng.randrange(len(lines))]
+        reports.append("\n".join(lines))
+    return "".join(f"{report}\n{REPORT_DELIMITER}\n\n" for report in reports)
+
+
+# name -> bundle text; missing_rate=0.3 leaves a section out of about a third of the reports
+BUNDLES = {
+    "generated": generate_bundle(N_REPORTS, seed=11, missing_rate=0.3),
+    "dropped_lines": _drop_lines(generate_bundle(N_REPORTS, seed=12, missing_rate=0.3), seed=12),
+    "crlf": generate_bundle(N_REPORTS, seed=13, missing_rate=0.3).replace("\n", "\r\n"),
+    "tabs_and_no_blank_lines": generate_bundle(N_REPORTS, seed=14).replace("  ", " \t ").replace("\n\n", "\n"),
+}
+
+
+def _legacy(func, *args):
+    # The legacy code prints every field it parses
+    with contextlib.redirect_stdout(io.StringIO()):
+        return func(*args)
+
+
+@pytest.mark.parametrize("name", BUNDLES)
+def test_parse_visa_report_matches_legacy(name):
+    for report in _split(BUNDLES[name]):
+        expected = _legacy(legacy_parser.parse_visa_report, report)
+        parsed = parse_visa_report(report)
+        assert parsed == expected
+        assert list(parsed) == list(expected)
+
+
+@pytest.mark.parametrize("name", BUNDLES)
+def test_processed_rows_match_legacy(name):
+    reports = _split(BUNDLES[name])
+    expected = pd.concat(
+        [_legacy(lambda r: legacy_parser.transform_report_data_to_rows(legacy_parser.parse_visa_report(r)), report)
+         for report in reports],
+        ignore_index=True,
+    )
+
+    df = process_multiple_visa_reports(BUNDLES[name])
+    assert RECONCILIATION_COLUMN in df.columns
+    df = df.drop(columns=[RECONCILIATION_COLUMN])
+    pd.testing.assert_frame_equal(df, expected, check_dtype=False)
@@ -0,0 +1,78 @@
+import pytest
+from sqlalchemy import event
+
+from app.database import make_engine
+from app.migrations import migrate
+from app.models import FILTER_COLUMNS
+from app.queries import AMOUNT_FIELDS, parse_filter, query_report_lines, seek_column
+from app.routes import process_multiple_visa_reports
+from app.storage import save_report_lines
+from benchmarks.generator import generate_bundle
+
+# Every filter field with an operator, plus the multi-filter shapes
+SHAPES = [
+    ["report_id=VSS-110"], ["reporting_for=1000670600 BIN 403993 INTL"], ["settlement_currency=USD"],
+    ["proc_date=2025-12-09"], ["report_date>=16MAY25"], ["major_type=Interchange"], ["minor_type!=ISSUER", "count>3"],
+    ["count<5"], ["credit_amount>100"], ["debit_amount<=50"], ["total_amount>=100"], ["crdb_label=DB"],
+    ["proc_date>=2025-05-01", "major_type=Interchange"], ["total_amount>=100", "crdb_label=CR", "count>50"],
+    ["crdb_label!=CR"], [],
+]
+
+
+@pytest.fixture(scope="module")
+def engine(tmp_path_factory):
+    engine = make_engine(f"sqlite:///{tmp_path_factory.mktemp('queries') / 'visa_reports.db'}")
+    migrate(engine)
+    save_report_lines(process_multiple_visa_reports(generate_bundle(60, seed=5)), engine)
+    yield engine
+    engine.dispose()
+
+
+def _query_plans(engine, filters, after):
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        query_report_lines(filters, after=after, limit=5, engine=engine)
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+
+    with engine.connect() as conn:
+        return [" / ".join(row[3] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters))
+                for statement, parameters in statements]
+
+
+@pytest.mark.parametrize("first_page", [True, False])
+@pytest.mark.parametrize("filters", SHAPES, ids=lambda filters: " & ".join(filters) or "none")
+def test_filters_seek_one_index_in_page_order(engine, filters, first_page):
+    after = None if first_page else query_report_lines(filters, limit=5, engine=engine)["next_after"]
+    assert first_page or after is not None
+    seek = seek_column([parse_filter(expression) for expression in filters])
+    for plan in _query_plans(engine, filters, after):
+        assert "TEMP B-TREE" not in plan
+        if seek is not None:
+            assert f"USING INDEX ix_visa_report_lines_{seek}_id" in plan or "INTEGER PRIMARY KEY (rowid=?)" in plan
+        elif after is not None:
+            assert "INTEGER PRIMARY KEY (rowid>?)" in plan
+
+
+def test_every_filter_field_has_an_index():
+    fields = {field for filters in SHAPES for field in (parse_filter(f)[0] for f in filters)}
+    assert fields == set(FILTER_COLUMNS)
+    assert set(AMOUNT_FIELDS.values()) <= set(FILTER_COLUMNS)
+
+
+@pytest.mark.parametrize("filters", SHAPES, ids=lambda filters: " & ".join(filters) or "none")
+def test_pages_add_up_to_the_whole_result(engine, filters):
+    whole = query_report_lines(filters, limit=100_000, engine=engine)["items"]
+    paged, after = [], None
+    while True:
+        page = query_report_lines(filters, after=after, limit=7, engine=engine)
+        paged += page["items"]
+        after = page["next_after"]
+        if after is None:
+            break
+    assert paged == whole
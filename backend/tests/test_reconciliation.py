@@ -0,0 +1,37 @@
+import json
+import re
+
+from app.parser import ROWS_PER_REPORT
+from app.routes import (
+    RECONCILIATION_HEADER, RECONCILIATION_SUMMARY_HEADER, _reconciliation_headers, process_multiple_visa_reports
+)
+from app.validation import SUMMARY_FAILURES, ReconciliationTally, reconciliation_summary
+from benchmarks.generator import generate_bundle
+
+N_REPORTS = 30
+
+
+def _off_by_a_cent(bundle: str) -> str:
+    """Every NET SETTLEMENT AMOUNT credit a cent off, so every report fails one check"""
+    return re.sub(r"(NET SETTLEMENT AMOUNT\s+[\d,]+\.\d)(\d)",
+                  lambda m: m.group(1) + str((int(m.group(2)) + 1) % 10), bundle)
+
+
+def test_response_headers_carry_the_job_summary():
+    df = process_multiple_visa_reports(_off_by_a_cent(generate_bundle(N_REPORTS, seed=9)))
+    headers = _reconciliation_headers(df)
+    summary = json.loads(headers[RECONCILIATION_SUMMARY_HEADER])
+
+    assert headers[RECONCILIATION_HEADER] == str(N_REPORTS)
+    assert summary == reconciliation_summary(df)
+    assert summary["reports_failed"] == N_REPORTS
+    assert len(summary["failures"]) == SUMMARY_FAILURES
+    assert summary["failures"][0]["problems"] == "NetSettlement CreditAmount"
+    headers[RECONCILIATION_SUMMARY_HEADER].encode("ascii")
+
+    # The streamed job result tallies batch by batch to the same summary
+    tally = ReconciliationTally()
+    batch_rows = 7 * ROWS_PER_REPORT
+    for start in range(0, len(df), batch_rows):
+        tally.add(df.iloc[start:start + batch_rows].reset_index(drop=True))
+    assert tally.summary() == summary
@@ -0,0 +1,150 @@
+import re
+import threading
+
+import pytest
+from sqlalchemy import inspect, text
+
+from app.database import make_engine
+from app.migrations import MIGRATIONS, SUPERSEDED_LINE_INDEXES, migrate
+from app.models import VisaReportLine
+from app.parser import ROWS_PER_REPORT
+from app.routes import process_multiple_visa_reports
+from app.storage import LATER_KEY_COLUMNS, save_report_lines
+from benchmarks.generator import generate_bundle
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = make_engine(f"sqlite:///{tmp_path / 'visa_reports.db'}")
+    migrate(engine)
+    yield engine
+    engine.dispose()
+
+
+def _line_count(engine) -> int:
+    with engine.connect() as conn:
+        return conn.execute(text("SELECT COUNT(*) FROM visa_report_lines")).scalar()
+
+
+def _assert_rollup_matches_lines(engine):
+    with engine.connect() as conn:
+        rollup = conn.execute(text(
+            "SELECT SUM(line_count), SUM(credit_minor), SUM(net_minor) FROM daily_settlement_rollup"
+        )).one()
+        lines = conn.execute(text(
+            "SELECT COUNT(*), SUM(credit_minor),"
+            " SUM(CASE WHEN crdb_label = 'DB' THEN -total_minor ELSE total_minor END)"
+            " FROM visa_report_lines WHERE proc_date IS NOT NULL"
+        )).one()
+    assert tuple(rollup) == tuple(lines)
+
+
+def test_reupload_without_proc_date_replaces_rows(engine):
+    bundle = re.sub(r"PROC DATE:\s+\S+", "PROC DATE:   ??", generate_bundle(5, seed=2))
+    df = process_multiple_visa_reports(bundle)
+    for _ in range(3):
+        save_report_lines(df, engine)
+    assert _line_count(engine) == len(df)
+
+
+def test_reports_differing_only_in_transaction_type_are_kept_apart(engine):
+    international = generate_bundle(1, seed=4)
+    assert "INTERNATIONAL SETTLEMENT SERVICE" in international
+    national = international.replace("INTERNATIONAL SETTLEMENT SERVICE", "NATIONAL NET SETTLEMENT SERVICE")
+
+    df = process_multiple_visa_reports(international + national)
+    assert save_report_lines(df, engine) == 2 * ROWS_PER_REPORT
+
+    # Uploading one of them again leaves the other alone
+    save_report_lines(process_multiple_visa_reports(national), engine)
+    with engine.connect() as conn:
+        assert conn.execute(text(
+            "SELECT transaction_type, COUNT(*) FROM visa_report_lines GROUP BY 1 ORDER BY 1"
+        )).all() == [
+            ("INTERNATIONAL SETTLEMENT SERVICE", ROWS_PER_REPORT),
+            ("NATIONAL NET SETTLEMENT SERVICE", ROWS_PER_REPORT),
+        ]
+    _assert_rollup_matches_lines(engine)
+
+
+def test_reupload_replaces_rows_stored_before_the_full_report_key(engine):
+    df = process_multiple_visa_reports(generate_bundle(5, seed=6))
+    save_report_lines(df, engine)
+    with engine.begin() as conn:
+        conn.exec_driver_sql(f"UPDATE visa_report_lines SET {', '.join(f'{col} = NULL' for col in LATER_KEY_COLUMNS)}")
+
+    save_report_lines(df, engine)
+    assert _line_count(engine) == len(df)
+    _assert_rollup_matches_lines(engine)
+
+
+def test_concurrent_reuploads_keep_rollup_in_step(engine):
+    base = process_multiple_visa_reports(generate_bundle(100, seed=1))
+    variants = []
+    for i in range(6):
+        df = base.copy()
+        df["CreditAmount"] += i
+        df["TotalAmount"] += 3 * i
+        variants.append(df)
+
+    errors = []
+
+    def upload(df):
+        try:
+            for _ in range(3):
+                save_report_lines(df, engine)
+        except Exception as e:  # surfaced by the assertion below
+            errors.append(e)
+
+    threads = [threading.Thread(target=upload, args=(df,)) for df in variants]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert _line_count(engine) == len(base)
+    _assert_rollup_matches_lines(engine)
+
+
+# visa_report_lines as the first release created it, before any schema revision
+LEGACY_SCHEMA = """
+CREATE TABLE visa_report_lines (
+    id INTEGER NOT NULL, report_id VARCHAR, proc_date VARCHAR, report_date VARCHAR,
+    major_type VARCHAR, minor_type VARCHAR, count INTEGER, credit_amount FLOAT,
+    debit_amount FLOAT, total_amount FLOAT, crdb_label VARCHAR, PRIMARY KEY (id)
+)
+"""
+
+
+def test_migrate_legacy_rows_reaches_latest_version(tmp_path):
+    engine = make_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as conn:
+        conn.exec_driver_sql(LEGACY_SCHEMA)
+        conn.exec_driver_sql(
+            "INSERT INTO visa_report_lines (report_id, proc_date, report_date, major_type, minor_type, count,"
+            " credit_amount, debit_amount, total_amount, crdb_label) VALUES"
+            " ('VSS-110', '16MAY25', '17MAY25', 'Interchange', 'ACQUIRER', 12, 100.5, 20.25, 80.25, 'CR'),"
+            " ('VSS-110', '16MAY25', '17MAY25', 'Interchange', 'ISSUER', NULL, 10.0, 30.0, 20.0, 'DB')"
+        )
+
+    migrate(engine)
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT version FROM schema_version")).scalar() == len(MIGRATIONS)
+    _assert_rollup_matches_lines(engine)
+
+    save_report_lines(process_multiple_visa_reports(generate_bundle(10, seed=3)), engine)
+    _assert_rollup_matches_lines(engine)
+    engine.dispose()
+
+
+def test_migrate_replaces_superseded_line_indexes(engine):
+    with engine.begin() as conn:
+        for name in SUPERSEDED_LINE_INDEXES:
+            conn.exec_driver_sql(f"CREATE INDEX {name} ON visa_report_lines (proc_date, major_type)")
+        conn.exec_driver_sql("UPDATE schema_version SET version = 4")
+
+    migrate(engine)
+    with engine.connect() as conn:
+        indexes = {index["name"] for index in inspect(conn).get_indexes("visa_report_lines")}
+    assert indexes == {index.name for index in VisaReportLine.__table__.indexes}
@@ -1,12 +1,48 @@
 import { useState } from "react";
 import axios from "axios";
 
+const API_URL = "http://localhost:8000";
+const JOB_POLL_INTERVAL_MS = 1000;
+
+// Uploads a report as a background job, polls until it finishes and returns the result blob.
+// Long bundles no longer hold one request open until axios gives up.
+async function runVisaJob(formData, onProgress) {
+  const { data: created } = await axios.post(`${API_URL}/jobs`, formData);
+
+  let job = created;
+  while (job.status === "queued" || job.status === "running") {
+    await new Promise((resolve) => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+    ({ data: job } = await axios.get(`${API_URL}${created.status_url}`));
+    onProgress(job);
+  }
+  if (job.status !== "done") {
+    throw new Error(job.error || "Job failed");
+  }
+
+  const res = await axios.get(`${API_URL}${created.result_url}`, { responseType: "blob" });
+  res.job = job;
+  return res;
+}
+
+// Warning for reports whose lines don't add up to their totals (flagged in the Reconciliation column)
+function reconciliationNote(job) {
+  const failed = job?.reconciliation?.reports_failed;
+  if (!failed) return "";
+  return `\n⚠️ ${failed} report(s) don't add up to their totals; see the Reconciliation column.`;
+}
+
+function progressLabel(job) {
+  if (!job || job.reports_total == null) return "Processing...";
+  return `Processing... ${job.reports_parsed} / ${job.reports_total} reports`;
+}
+
 
 function FileUploader() {
   const [activeTab, setActiveTab] = useState("visa"); // Only visa tab now
   const [file, setFile] = useState(null);
   const [isProcessing, setIsProcessing] = useState(false);
   const [error, setError] = useState("");
+  const [jobProgress, setJobProgress] = useState(null);
 
   // Add this state
   const [reportAction, setReportAction] = useState('new'); // 'new' or 'aggregate'
@@ -85,9 +121,7 @@ function FileUploader() {
       const formData = new FormData();
       formData.append("file", file);
 
-      const res = await axios.post("http://localhost:8000/process-visa-report", formData, {
-        responseType: "blob",
-      });
+      const res = await runVisaJob(formData, setJobProgress);
 
       // Extract filename from headers
       const disposition = res.headers["content-disposition"];
@@ -106,12 +140,13 @@ function FileUploader() {
       document.body.appendChild(link);
       link.click();
       link.remove();
-      alert("✅ Visa report saved and converted to excel file");
+      alert("✅ Visa report saved and converted to excel file" + reconciliationNote(res.job));
     } catch (err) {
       console.error(err);
       setError("❌ Failed to process Visa Report.");
     } finally {
       setIsProcessing(false);
+      setJobProgress(null);
     }
   };
 
@@ -132,9 +167,7 @@ function FileUploader() {
       formData.append("file", file);
       formData.append("output", output);
 
-      const res = await axios.post("http://localhost:8000/process-visa-report", formData, {
-        responseType: "blob",
-      });
+      const res = await runVisaJob(formData, setJobProgress);
 
       // Extract filename from Content-Disposition header
       const disposition = res.headers["content-disposition"];
@@ -154,12 +187,13 @@ function FileUploader() {
       link.click();
       link.remove();
 
-      alert("✅ Visa report saved to database and file downloaded.");
+      alert("✅ Visa report saved to database and file downloaded." + reconciliationNote(res.job));
     } catch (err) {
       console.error(err);
       setError("❌ Failed to save Visa Report to database.");
     } finally {
       setIsProcessing(false);
+      setJobProgress(null);
     }
   };
 
@@ -331,7 +365,7 @@ console.log("Current tab:", activeTab);
               width: "100%",
             }}
           >
-            {isProcessing ? "Processing..." : "💾 Save to Database"}
+            {isProcessing ? progressLabel(jobProgress) : "💾 Save to Database"}
           </button>
 
           <button
@@ -350,7 +384,7 @@ console.log("Current tab:", activeTab);
               transition: "all 0.3s",
             }}
           >
-            {isProcessing ? "Processing..." : "🚀 Process Visa Report to Excel File"}
+            {isProcessing ? progressLabel(jobProgress) : "🚀 Process Visa Report to Excel File"}
           </button>
 
           {error && (